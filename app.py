@@ -1,32 +1,312 @@
-from flask import Flask, render_template, jsonify, request, session
+import os
+
+if os.environ.get('GEVENT') == '1':
+    # Patch blocking I/O before Flask and SQLAlchemy pull in sockets and threads
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, render_template, jsonify, request, session, Response, g
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from map_generator import MapGenerator
 from models import db, Player, MechTemplate, PlayerMech, VehicleTemplate, PlayerVehicle
-from game_logic import BattleTechGame
-import json
-import os
+from game_engine import GameEngine
+from game_logic import TERRAIN_MOVEMENT_COSTS, TERRAIN_ENCOUNTER_CHANCES, IMPASSABLE_TERRAIN
+from schemas import SchemaError, parse_body, MoveRequest, CreateCharacterRequest, PurchaseMechRequest, RepairRequest
+from sqlalchemy import event, func, case, update, select, bindparam
+from sqlalchemy.orm import selectinload, joinedload, raiseload
+import orjson
+import functools
+import hashlib
 import random
+import threading
+from collections import OrderedDict
 from datetime import datetime
 
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes and decodes with orjson."""
+    # Sorted keys keep the output identical to Flask's default encoder
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a JSON string."""
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        """Deserialize a JSON string or bytes."""
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = 'battletech-mud-secret-key-change-in-production'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///battletech_mud.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 25,
+    'max_overflow': 25,
+    'pool_pre_ping': True,
+    'pool_recycle': 1800,
+    # Room for every distinct statement's compiled form so none are recompiled
+    'query_cache_size': 1200,
+    'connect_args': {'check_same_thread': False, 'timeout': 30}
+}
+# Read-only connections to the same file; with WAL they never wait on the writer
+app.config['SQLALCHEMY_BINDS'] = {
+    'readonly': 'sqlite:///file:battletech_mud.db?mode=ro&uri=true'
+}
 
 db.init_app(app)
-game_engine = BattleTechGame()
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each new SQLite connection once, when the pool opens it."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.execute('PRAGMA cache_size=-64000')
+    cursor.close()
+
+def set_readonly_pragmas(dbapi_connection, connection_record):
+    """Tune each new read-only connection; the journal mode is the writer's to set."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.execute('PRAGMA cache_size=-64000')
+    cursor.close()
+
+# Register before any connection is opened so every pooled connection is tuned,
+# whether the app is started via app.py or imported by another server/script.
+with app.app_context():
+    event.listen(db.engine, 'connect', set_sqlite_pragmas)
+    event.listen(db.engines['readonly'], 'connect', set_readonly_pragmas)
+game_engine = GameEngine()
+
+# Eager-load a player's units and their templates so to_dict() and the hangar
+# totals walk already-populated collections instead of lazy-loading per unit.
+PLAYER_UNITS_LOADER = (
+    selectinload(Player.mechs).joinedload(PlayerMech.template),
+    selectinload(Player.vehicles).joinedload(PlayerVehicle.template)
+)
+
+# Read paths that only serialize the player also refuse any further lazy load,
+# so a relationship missed by the loader fails loudly instead of going N+1.
+# The active mech is still resolved from the identity map without SQL.
+PLAYER_READ_LOADER = (*PLAYER_UNITS_LOADER, raiseload('*', sql_only=True))
+
+# Name lookups are built once; each request only binds the name and hits the
+# engine's compiled cache
+PLAYER_ID_BY_NAME = select(Player.id).where(func.lower(Player.name) == func.lower(bindparam('name'))).limit(1)
+PLAYER_BY_NAME = select(Player).options(*PLAYER_READ_LOADER).where(func.lower(Player.name) == func.lower(bindparam('name'))).limit(1)
+
+def load_catalog(path, key):
+    """Load a shop catalog once at startup (None if it cannot be read)."""
+    try:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())[key]
+    except Exception as e:
+        print(f"Error loading {path}: {e}")
+        return None
+
+# Shop catalogs are static, so parse them and derive prices once per process
+MECHS = load_catalog('data/mechs.json', 'mechs')
+WEAPONS = load_catalog('data/weapons.json', 'weapons')
+EQUIPMENT = load_catalog('data/equipment.json', 'equipment')
+
+def index_mechs(mechs):
+    """Attach a purchase price to each mech and index the catalog by name."""
+    by_name = {}
+    for mech in mechs or []:
+        # Use value from Excel if available, otherwise calculate price
+        if 'value' in mech:
+            mech['price'] = mech['value']
+        else:
+            # Price formula: tonnage * 50 + battle_value * 2
+            mech['price'] = mech['tonnage'] * 50 + mech['battle_value'] * 2
+        by_name.setdefault(mech['name'], mech)
+    return by_name
+
+MECH_INDEX = index_mechs(MECHS)
+
+def build_static_body(payload):
+    """Serialize a read-only JSON payload once and derive its ETag."""
+    body = f"{app.json.dumps(payload)}\n".encode('utf-8')
+    return body, hashlib.md5(body).hexdigest()
+
+def static_json_response(body, etag, private=False):
+    """Serve a pre-serialized body, answering 304 when the client's ETag matches."""
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    if private:
+        # Per-session payloads are revalidated on every use and never shared by proxies
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = 300
+    return response.make_conditional(request)
+
+# The shop payloads never change at runtime, so skip re-serializing them per request
+MECH_SHOP_BODY = build_static_body({'success': True, 'mechs': MECHS}) if MECHS is not None else None
+WEAPONS_SHOP_BODY = build_static_body({'success': True, 'weapons': WEAPONS}) if WEAPONS is not None else None
+EQUIPMENT_SHOP_BODY = build_static_body({'success': True, 'equipment': EQUIPMENT}) if EQUIPMENT is not None else None
+
+def player_etag(player, view):
+    """Tag a per-player read with the player's cache version."""
+    return f'{view}-{player.id}-{player.cache_version or 0}'
+
+def player_not_modified(etag):
+    """Return a 304 when the client already holds this version of the read."""
+    if etag not in request.if_none_match:
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def player_json_response(payload, etag):
+    """Serve a per-player read that clients must revalidate before reusing."""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def parse_json(schema):
+    """Parse the request's JSON body into a schema, or build the error response."""
+    try:
+        return parse_body(schema, request.get_json(silent=True)), None
+    except SchemaError as e:
+        return None, jsonify({'success': False, 'message': str(e)})
+
+# Unit dicts per player, tagged with the cache_version they were built at; every
+# write bumps the version, so an outdated entry is never served. One entry per
+# player, least recently used players evicted past the size limit
+PLAYER_UNITS_CACHE = OrderedDict()
+PLAYER_UNITS_CACHE_SIZE = 1024
+PLAYER_UNITS_CACHE_LOCK = threading.Lock()
+
+def player_dict(player):
+    """Serialize a player, reusing cached unit dicts while cache_version is unchanged."""
+    version = player.cache_version or 0
+    with PLAYER_UNITS_CACHE_LOCK:
+        cached = PLAYER_UNITS_CACHE.get(player.id)
+        if cached is not None:
+            PLAYER_UNITS_CACHE.move_to_end(player.id)
+    
+    if cached is None or cached[0] != version:
+        cached = (version, player.units_to_dict())
+        with PLAYER_UNITS_CACHE_LOCK:
+            PLAYER_UNITS_CACHE[player.id] = cached
+            PLAYER_UNITS_CACHE.move_to_end(player.id)
+            while len(PLAYER_UNITS_CACHE) > PLAYER_UNITS_CACHE_SIZE:
+                PLAYER_UNITS_CACHE.popitem(last=False)
+    return player.to_dict(units=cached[1])
+
+def readonly(view):
+    """Serve a pure-read view from the read-only engine."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # A replayed pending move must not autoflush into the read-only connection
+        db.session.info['readonly'] = True
+        try:
+            with db.session.no_autoflush:
+                return view(*args, **kwargs)
+        finally:
+            db.session.info.pop('readonly', None)
+    return wrapper
+
+# Uncommitted sub-hex moves per player id: [id, x, y, movement points, cache_version,
+# turn_number]. Held server-side so a client cannot replay or edit one, and tagged
+# with the row state it was made from; cleared once a commit persists it
+PENDING_MOVES = {}
+
+def require_player(*options):
+    """Load the session's player into g.player, applying any loader options."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            player_id = session.get('player_id')
+            if not player_id:
+                return jsonify({'success': False, 'message': 'No character loaded.'})
+            
+            # Session.get checks the identity map first and skips the legacy Query path
+            player = db.session.get(Player, player_id, options=options)
+            if not player:
+                return jsonify({'success': False, 'message': 'Character not found.'})
+            
+            # Replay a buffered sub-hex move that has not been committed yet, but only
+            # onto the row it was made from; any commit since then supersedes it
+            pending = PENDING_MOVES.get(player.id)
+            if pending is not None:
+                if pending[4] == (player.cache_version or 0) and pending[5] == player.turn_number:
+                    player.set_exact_position(pending[1], pending[2])
+                    player.movement_points_remaining = pending[3]
+                    g.pending_move = pending
+                else:
+                    PENDING_MOVES.pop(player.id, None)
+            
+            g.player = player
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def touch_player(player_id):
+    """Bump last_active with a narrow UPDATE that lands with the caller's commit."""
+    # Only for routes that write nothing else to the player row; a route that already
+    # dirties the player sets last_active on it so the ORM flush carries it
+    db.session.execute(
+        update(Player).where(Player.id == player_id).values(last_active=datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    )
+
+def mark_committed(db_session):
+    """Record on the request's session that its changes were committed."""
+    db_session.info['committed'] = True
+
+event.listen(db.session, 'after_commit', mark_committed)
+
+@app.after_request
+def buffer_pending_move(response):
+    """Keep uncommitted movement on the server so it survives to the next request."""
+    pending = g.get('pending_move')
+    if pending:
+        if db.session.info.get('committed'):
+            PENDING_MOVES.pop(pending[0], None)
+        else:
+            PENDING_MOVES[pending[0]] = pending
+    return response
 
 @app.route('/')
 def index():
     """Render the main page."""
     return render_template('index.html')
 
+@functools.lru_cache(maxsize=64)
+def generate_map_data(seed):
+    """Generate the map for a seed once; maps are pure functions of it."""
+    return MapGenerator(64, 64, seed=seed).generate_map()
+
+@functools.lru_cache(maxsize=64)
+def generate_map_body(seed):
+    """Serialize the map for a seed once."""
+    return build_static_body(generate_map_data(seed).to_rows())
+
+def player_terrain(player):
+    """Terrain under the player's stored position on this game's map (None if unknown)."""
+    seed = session.get('map_seed')
+    if seed is None:
+        return None
+    return generate_map_data(seed).terrain_at(player.map_x, player.map_y)
+
 @app.route('/generate_map')
 def generate_map():
     """Generate and return map data."""
-    map_gen = MapGenerator(64, 64)
-    map_data = map_gen.generate_map()
-    return jsonify(map_data)
+    # Each game gets its own random map; the seed is picked here and kept in the session,
+    # so reloads hit the cache and clients cannot key it on seeds of their own
+    seed = session.get('map_seed')
+    if seed is None or request.args.get('new', 0, type=int):
+        seed = session['map_seed'] = random.getrandbits(32)
+    return static_json_response(*generate_map_body(seed), private=True)
 
 @app.route('/get_starting_mechs')
 def get_starting_mechs():
@@ -41,23 +321,22 @@ def get_starting_mechs():
 @app.route('/create_character', methods=['POST'])
 def create_character():
     """Create a new player character."""
-    data = request.get_json()
-    
-    name = data.get('name', '').strip()
-    gunnery = int(data.get('gunnery', 8))
-    piloting = int(data.get('piloting', 8))
-    guts = int(data.get('guts', 8))
-    tactics = int(data.get('tactics', 8))
-    skills = data.get('skills', {})
-    starting_mech = data.get('starting_mech')  # New field for starting mech selection
+    # Types and skill bounds are checked by the schema
+    req, error = parse_json(CreateCharacterRequest)
+    if error:
+        return error
+    
+    name = req.name
+    gunnery = req.gunnery
+    piloting = req.piloting
+    guts = req.guts
+    tactics = req.tactics
+    starting_mech = req.starting_mech  # New field for starting mech selection
     
     # Validate input
     if not name or len(name) < 2:
         return jsonify({'success': False, 'message': 'Name must be at least 2 characters long.'})
     
-    if any(skill < 0 or skill > 8 for skill in [gunnery, piloting, guts, tactics]):
-        return jsonify({'success': False, 'message': 'All skills must be between 0 and 8.'})
-    
     # Validate point allocation (skills start at 8 each, spend 10 points to improve)
     total_points = gunnery + piloting + guts + tactics
     points_spent = 32 - total_points  # Started with 32 total (8 each), spent points reduce total
@@ -68,9 +347,9 @@ def create_character():
     if not starting_mech:
         return jsonify({'success': False, 'message': 'Please select a starting mech.'})
     
-    # Check if name already exists
-    existing_player = Player.query.filter_by(name=name).first()
-    if existing_player:
+    # Check if name already exists (an id-only probe of the lower(name) index)
+    existing_player_id = db.session.scalar(PLAYER_ID_BY_NAME, {'name': name})
+    if existing_player_id:
         return jsonify({'success': False, 'message': 'A character with that name already exists.'})
     
     # Create new player
@@ -82,7 +361,7 @@ def create_character():
             guts=guts,
             tactics=tactics
         )
-        player.set_skills(skills)
+        player.set_skills(req.skills or {})
         
         # Initialize movement system (no mech yet, so 0 movement points)
         player.movement_points_remaining = 0.0
@@ -109,7 +388,7 @@ def create_character():
         return jsonify({
             'success': True,
             'message': f'Character {name} created successfully with {starting_mech}! You can now move on the map.',
-            'player': player.to_dict()
+            'player': player_dict(player)
         })
     except Exception as e:
         db.session.rollback()
@@ -124,12 +403,12 @@ def load_character():
     if not name:
         return jsonify({'success': False, 'message': 'Please enter a character name.'})
     
-    player = Player.query.filter_by(name=name).first()
+    player = db.session.scalar(PLAYER_BY_NAME, {'name': name})
     if not player:
         return jsonify({'success': False, 'message': 'Character not found.'})
     
     # Update last active time
-    player.last_active = datetime.utcnow()
+    touch_player(player.id)
     db.session.commit()
     
     # Store player ID in session
@@ -137,114 +416,108 @@ def load_character():
     
     return jsonify({
         'success': True,
-        'message': f'Welcome back, {name}!',
-        'player': player.to_dict()
+        'message': f'Welcome back, {player.name}!',
+        'player': player_dict(player)
     })
 
 @app.route('/get_player_info')
+@readonly
+@require_player(*PLAYER_READ_LOADER)
 def get_player_info():
     """Get current player information."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    player = g.player
     
     return jsonify({
         'success': True,
-        'player': player.to_dict()
+        'player': player_dict(player)
     })
 
 @app.route('/move_player', methods=['POST'])
+@require_player(*PLAYER_UNITS_LOADER)
 def move_player():
     """Move player to a new location using turn-based movement."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    player = g.player
     
     # Check if player has an active mech
     active_mech = player.get_active_mech()
     if not active_mech:
         return jsonify({'success': False, 'message': 'No operational mech available for movement.'})
     
-    data = request.get_json()
-    target_x = float(data.get('x', player.map_x))
-    target_y = float(data.get('y', player.map_y))
-    terrain_type = data.get('terrain_type', 'plains')
+    req, error = parse_json(MoveRequest)
+    if error:
+        return error
+    
+    target_x = req.x if req.x is not None else float(player.map_x)
+    target_y = req.y if req.y is not None else float(player.map_y)
+    terrain_type = req.terrain_type
     
     # Validate movement
-    if not game_engine.can_move_to_terrain(terrain_type):
+    if terrain_type in IMPASSABLE_TERRAIN:
         return jsonify({'success': False, 'message': f'Cannot move to {terrain_type}.'})
     
-    # Calculate terrain movement cost
-    terrain_cost = game_engine.get_terrain_movement_cost(terrain_type)
+    # Calculate terrain movement cost straight from the terrain table
+    terrain_cost = TERRAIN_MOVEMENT_COSTS.get(terrain_type, 1)
     
-    # Check if player can move to target
-    if not player.can_move_to(target_x, target_y, terrain_cost):
+    # Read the current position once; move_to() validates the cost itself
+    current_x = player.map_x + player.map_x_frac
+    current_y = player.map_y + player.map_y_frac
+    if not player.move_to(target_x, target_y, terrain_cost):
         remaining = player.movement_points_remaining
         return jsonify({
             'success': False, 
             'message': f'Insufficient movement points. {remaining:.1f} remaining.'
         })
     
-    # Perform the move
-    current_pos = player.get_exact_position()
-    if player.move_to(target_x, target_y, terrain_cost):
+    # Calculate distance moved
+    distance = abs(target_x - current_x) + abs(target_y - current_y)
+    move_cost = distance * terrain_cost
+    
+    # Check for encounter (only on full hex moves)
+    encounter = None
+    is_full_hex = target_x == int(target_x) and target_y == int(target_y)
+    if is_full_hex:
+        if random.random() < TERRAIN_ENCOUNTER_CHANCES.get(terrain_type, 0.2):
+            encounter = game_engine.generate_encounter(player, terrain_type)
+    
+    # Clear declined missions when moving
+    had_declined_missions = bool(player.get_declined_missions())
+    player.clear_declined_missions()
+    
+    # Sub-hex steps ride in the session buffer until the next real commit
+    if is_full_hex or had_declined_missions:
+        player.bump_cache_version()
         player.last_active = datetime.utcnow()
-        
-        # Calculate distance moved
-        distance = abs(target_x - current_pos['x']) + abs(target_y - current_pos['y'])
-        move_cost = distance * terrain_cost
-        
-        # Check for encounter (only on full hex moves)
-        encounter = None
-        if target_x == int(target_x) and target_y == int(target_y):
-            encounter_chance = game_engine.get_encounter_chance(terrain_type)
-            if random.random() < encounter_chance:
-                encounter = game_engine.generate_encounter(terrain_type)
-        
-        # Clear declined missions when moving
-        player.clear_declined_missions()
-        
         db.session.commit()
-        
-        terrain_name = terrain_type.replace('_', ' ').title()
-        exact_pos = player.get_exact_position()
-        
-        response = {
-            'success': True,
-            'message': f'Moved to ({exact_pos["x"]:.1f}, {exact_pos["y"]:.1f}) - {terrain_name}. Used {move_cost:.1f} movement points.',
-            'player': player.to_dict(),
-            'movement_cost': move_cost,
-            'distance_moved': distance
-        }
-        
-        if encounter:
-            response['encounter'] = encounter
-        
-        return jsonify(response)
     else:
-        return jsonify({'success': False, 'message': 'Movement failed.'})
+        g.pending_move = [
+            player.id, target_x, target_y, player.movement_points_remaining,
+            player.cache_version or 0, player.turn_number
+        ]
+    
+    terrain_name = terrain_type.replace('_', ' ').title()
     
+    response = {
+        'success': True,
+        'message': f'Moved to ({target_x:.1f}, {target_y:.1f}) - {terrain_name}. Used {move_cost:.1f} movement points.',
+        'player': player_dict(player),
+        'movement_cost': move_cost,
+        'distance_moved': distance
+    }
+    
+    if encounter:
+        response['encounter'] = encounter
+    
+    return jsonify(response)
+
 @app.route('/end_turn', methods=['POST'])
+@require_player(*PLAYER_UNITS_LOADER)
 def end_turn():
     """End current turn and start a new one."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    player = g.player
     
     # Start new turn
     player.start_turn()
+    player.bump_cache_version()
     player.last_active = datetime.utcnow()
     
     # Clear declined missions when ending turn
@@ -255,19 +528,14 @@ def end_turn():
     return jsonify({
         'success': True,
         'message': f'Turn {player.turn_number} started. Movement points refreshed.',
-        'player': player.to_dict()
+        'player': player_dict(player)
     })
 
 @app.route('/set_active_mech', methods=['POST'])
+@require_player(*PLAYER_UNITS_LOADER)
 def set_active_mech():
     """Set the active mech for movement."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    player = g.player
     
     data = request.get_json()
     mech_id = data.get('mech_id')
@@ -276,7 +544,7 @@ def set_active_mech():
         return jsonify({'success': False, 'message': 'No mech ID provided.'})
     
     # Find the mech
-    mech = next((m for m in player.mechs if m.id == mech_id), None)
+    mech = PlayerMech.query.options(joinedload(PlayerMech.template)).filter_by(id=mech_id, player_id=player.id).first()
     if not mech:
         return jsonify({'success': False, 'message': 'Mech not found.'})
     
@@ -284,166 +552,125 @@ def set_active_mech():
         return jsonify({'success': False, 'message': 'Mech is not operational.'})
     
     # Set active mech and refresh movement points
-    player.active_mech_id = mech_id
+    player.active_mech = mech
     player.movement_points_remaining = player.get_movement_points()
+    player.bump_cache_version()
     player.last_active = datetime.utcnow()
     db.session.commit()
     
     return jsonify({
         'success': True,
         'message': f'Active mech set to {mech.get_display_name()}. Movement points refreshed.',
-        'player': player.to_dict()
+        'player': player_dict(player)
     })
 
 @app.route('/resolve_encounter', methods=['POST'])
+@require_player(*PLAYER_UNITS_LOADER)
 def resolve_encounter():
     """Resolve an encounter."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    player = g.player
     
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     encounter = data.get('encounter')
     
-    if not encounter:
+    if not isinstance(encounter, dict) or not encounter.get('id'):
         return jsonify({'success': False, 'message': 'No encounter data provided.'})
     
+    # Only the id is taken from the client; chance, rewards and terrain are the server's
+    if not game_engine.is_encounter_available(player, encounter['id']):
+        return jsonify({'success': False, 'message': 'Unknown encounter.'})
+    
     # Resolve the encounter
-    result = game_engine.resolve_encounter(player, encounter)
+    result = game_engine.resolve_encounter(player, encounter['id'], player_terrain(player))
+    player.bump_cache_version()
     
     db.session.commit()
     
     return jsonify({
         'success': True,
-        'result': result,
-        'player': player.to_dict()
+        'result': result.to_dict(),
+        'player': player_dict(player)
     })
 
 @app.route('/get_mech_shop')
 def get_mech_shop():
     """Get available mechs for purchase."""
-    # For now, return mechs from our JSON file
-    try:
-        with open('data/mechs.json', 'r') as f:
-            mechs_data = json.load(f)
-        
-        # Use existing value if available, otherwise calculate price
-        for mech in mechs_data['mechs']:
-            # Use value from Excel if available, otherwise calculate price
-            if 'value' in mech:
-                mech['price'] = mech['value']
-            else:
-                # Price formula: tonnage * 50 + battle_value * 2
-                base_price = mech['tonnage'] * 50 + mech['battle_value'] * 2
-                mech['price'] = base_price
-        
-        return jsonify({
-            'success': True,
-            'mechs': mechs_data['mechs']
-        })
-    except Exception as e:
+    if MECH_SHOP_BODY is None:
         return jsonify({'success': False, 'message': 'Error loading mech shop data.'})
+    
+    return static_json_response(*MECH_SHOP_BODY)
 
 @app.route('/get_weapons_shop')
 def get_weapons_shop():
     """Get available weapons for purchase."""
-    try:
-        with open('data/weapons.json', 'r') as f:
-            weapons_data = json.load(f)
-        
-        return jsonify({
-            'success': True,
-            'weapons': weapons_data['weapons']
-        })
-    except Exception as e:
+    if WEAPONS_SHOP_BODY is None:
         return jsonify({'success': False, 'message': 'Error loading weapons shop data.'})
+    
+    return static_json_response(*WEAPONS_SHOP_BODY)
 
 @app.route('/get_equipment_shop')
 def get_equipment_shop():
     """Get available equipment for purchase."""
-    try:
-        with open('data/equipment.json', 'r') as f:
-            equipment_data = json.load(f)
-        
-        return jsonify({
-            'success': True,
-            'equipment': equipment_data['equipment']
-        })
-    except Exception as e:
+    if EQUIPMENT_SHOP_BODY is None:
         return jsonify({'success': False, 'message': 'Error loading equipment shop data.'})
+    
+    return static_json_response(*EQUIPMENT_SHOP_BODY)
 
 @app.route('/purchase_mech', methods=['POST'])
+@require_player(*PLAYER_UNITS_LOADER)
 def purchase_mech():
     """Purchase a mech."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
+    player = g.player
     
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    req, error = parse_json(PurchaseMechRequest)
+    if error:
+        return error
     
-    data = request.get_json()
-    mech_name = data.get('mech_name')
+    mech_name = req.mech_name
     
-    # Load mech data
     try:
-        with open('data/mechs.json', 'r') as f:
-            mechs_data = json.load(f)
-        
         # Find the mech
-        selected_mech = None
-        for mech in mechs_data['mechs']:
-            if mech['name'] == mech_name:
-                selected_mech = mech
-                break
-        
+        selected_mech = MECH_INDEX.get(mech_name)
         if not selected_mech:
             return jsonify({'success': False, 'message': 'Mech not found.'})
         
-        # Use value from Excel if available, otherwise calculate price
-        if 'value' in selected_mech:
-            price = selected_mech['value']
-        else:
-            price = selected_mech['tonnage'] * 50 + selected_mech['battle_value'] * 2
+        price = selected_mech['price']
         
         # Check if player can afford it
         if not player.can_afford(price):
             return jsonify({'success': False, 'message': f'Not enough credits. Need {price}, have {player.credits}.'})
         
-        # Create or find mech template
-        template = MechTemplate.query.filter_by(name=selected_mech['name'], model=selected_mech['model']).first()
-        if not template:
-            template = MechTemplate(
-                name=selected_mech['name'],
-                model=selected_mech['model'],
-                tonnage=selected_mech['tonnage'],
-                battle_value=selected_mech['battle_value'],
-                price=price
+        # Link objects rather than ids so the commit's single flush inserts everything
+        with db.session.no_autoflush:
+            # Create or find mech template
+            template = MechTemplate.find(selected_mech['name'], selected_mech['model'])
+            if not template:
+                template = MechTemplate(
+                    name=selected_mech['name'],
+                    model=selected_mech['model'],
+                    tonnage=selected_mech['tonnage'],
+                    battle_value=selected_mech['battle_value'],
+                    price=price
+                )
+                template.set_specs(selected_mech)
+            
+            # Purchase the mech
+            player.spend_credits(price)
+            
+            player_mech = PlayerMech(
+                owner=player,
+                template=template
             )
-            template.set_specs(selected_mech)
-            db.session.add(template)
-            db.session.flush()  # Get the ID
-        
-        # Purchase the mech
-        player.spend_credits(price)
-        
-        player_mech = PlayerMech(
-            player_id=player.id,
-            template_id=template.id
-        )
-        db.session.add(player_mech)
-        db.session.flush()  # Get the mech ID
-        
-        # If this is the first mech, set it as active
-        is_first_mech = not player.active_mech_id
-        if is_first_mech:
-            player.active_mech_id = player_mech.id
-            player.movement_points_remaining = player.get_movement_points()
+            db.session.add(player_mech)
+            player.adjust_operational_mech_count(1)
+            
+            # If this is the first mech, set it as active
+            is_first_mech = not player.active_mech_id
+            if is_first_mech:
+                player.active_mech = player_mech
+                player.movement_points_remaining = player.get_movement_points()
+            
+            player.bump_cache_version()
         
         db.session.commit()
         
@@ -454,7 +681,7 @@ def purchase_mech():
         return jsonify({
             'success': True,
             'message': message,
-            'player': player.to_dict()
+            'player': player_dict(player)
         })
         
     except Exception as e:
@@ -462,34 +689,31 @@ def purchase_mech():
         return jsonify({'success': False, 'message': 'Error purchasing mech. Please try again.'})
 
 @app.route('/get_available_missions')
+@readonly
+@require_player()
 def get_available_missions():
     """Get missions available to the player."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
+    player = g.player
     
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    # Polling clients revalidate against the player's cache version
+    etag = player_etag(player, 'missions')
+    not_modified = player_not_modified(etag)
+    if not_modified:
+        return not_modified
     
     # Get available missions with level-scaled rewards
     available_missions = game_engine.get_available_missions(player)
     
-    return jsonify({
+    return player_json_response({
         'success': True,
         'missions': available_missions
-    })
+    }, etag)
 
 @app.route('/start_mission', methods=['POST'])
+@require_player(*PLAYER_UNITS_LOADER)
 def start_mission():
     """Start a mission."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    player = g.player
     
     data = request.get_json()
     mission_id = data.get('mission_id')
@@ -500,32 +724,28 @@ def start_mission():
     # Start the mission
     result = game_engine.start_mission(player, mission_id)
     
-    if result['success']:
+    if result.success:
+        player.bump_cache_version()
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'message': result['message'],
-            'rewards': result.get('rewards', {}),
-            'leveled_up': result.get('leveled_up', False),
-            'player': player.to_dict()
+            'message': result.message,
+            'rewards': result.rewards,
+            'leveled_up': result.leveled_up,
+            'player': player_dict(player)
         })
     else:
         return jsonify({
             'success': False,
-            'message': result['message']
+            'message': result.message
         })
 
 @app.route('/decline_mission', methods=['POST'])
+@require_player(*PLAYER_UNITS_LOADER)
 def decline_mission():
     """Decline a mission."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    player = g.player
     
     data = request.get_json()
     mission_id = data.get('mission_id')
@@ -537,12 +757,13 @@ def decline_mission():
     result = game_engine.decline_mission(player, mission_id)
     
     if result['success']:
+        player.bump_cache_version()
         db.session.commit()
         
         return jsonify({
             'success': True,
             'message': result['message'],
-            'player': player.to_dict()
+            'player': player_dict(player)
         })
     else:
         return jsonify({
@@ -551,32 +772,45 @@ def decline_mission():
         })
 
 @app.route('/get_hangar')
+@readonly
+@require_player()
 def get_hangar():
     """Get player's hangar with all owned mechs and vehicles."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
+    player = g.player
+    
+    # Polling clients revalidate against the player's cache version before any unit is loaded
+    etag = player_etag(player, 'hangar')
+    not_modified = player_not_modified(etag)
+    if not_modified:
+        return not_modified
+    
+    # Load the units only once the client actually needs the body
+    mechs = db.session.scalars(
+        select(PlayerMech).options(joinedload(PlayerMech.template)).where(PlayerMech.player_id == player.id)
+    ).all()
+    vehicles = db.session.scalars(
+        select(PlayerVehicle).options(joinedload(PlayerVehicle.template)).where(PlayerVehicle.player_id == player.id)
+    ).all()
+    
+    # Aggregate hangar stats in SQL rather than walking every unit in Python
+    total_mechs, operational_mechs, mech_value, mech_repair_cost = db.session.query(
+        func.count(PlayerMech.id),
+        func.count(case((PlayerMech.operational_expression(), 1))),
+        func.coalesce(func.sum(MechTemplate.price), 0),
+        func.coalesce(func.sum(PlayerMech.repair_cost_expression()), 0)
+    ).join(MechTemplate).filter(PlayerMech.player_id == player.id).one()
+    
+    total_vehicles, operational_vehicles, vehicle_value, vehicle_repair_cost = db.session.query(
+        func.count(PlayerVehicle.id),
+        func.count(case((PlayerVehicle.operational_expression(), 1))),
+        func.coalesce(func.sum(VehicleTemplate.price), 0),
+        func.coalesce(func.sum(PlayerVehicle.repair_cost_expression()), 0)
+    ).join(VehicleTemplate).filter(PlayerVehicle.player_id == player.id).one()
     
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
-    
-    # Calculate hangar stats
-    total_mechs = len(player.mechs)
-    operational_mechs = sum(1 for mech in player.mechs if mech.is_operational())
-    total_vehicles = len(player.vehicles)
-    operational_vehicles = sum(1 for vehicle in player.vehicles if vehicle.is_operational())
-    
-    # Calculate total hangar value
-    mech_value = sum(mech.template.price for mech in player.mechs)
-    vehicle_value = sum(vehicle.template.price for vehicle in player.vehicles)
     total_value = mech_value + vehicle_value
+    total_repair_cost = mech_repair_cost + vehicle_repair_cost
     
-    # Calculate total repair costs
-    total_repair_cost = sum(mech.get_repair_cost() for mech in player.mechs)
-    total_repair_cost += sum(vehicle.get_repair_cost() for vehicle in player.vehicles)
-    
-    return jsonify({
+    return player_json_response({
         'success': True,
         'hangar': {
             'stats': {
@@ -587,26 +821,24 @@ def get_hangar():
                 'total_value': total_value,
                 'total_repair_cost': total_repair_cost
             },
-            'mechs': [mech.to_dict() for mech in player.mechs],
-            'vehicles': [vehicle.to_dict() for vehicle in player.vehicles]
+            'mechs': [mech.to_dict() for mech in mechs],
+            'vehicles': [vehicle.to_dict() for vehicle in vehicles]
         }
-    })
+    }, etag)
 
 @app.route('/repair_unit', methods=['POST'])
+@require_player(*PLAYER_UNITS_LOADER)
 def repair_unit():
     """Repair a mech or vehicle."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
+    player = g.player
     
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    req, error = parse_json(RepairRequest)
+    if error:
+        return error
     
-    data = request.get_json()
-    unit_type = data.get('unit_type')  # 'mech' or 'vehicle'
-    unit_id = data.get('unit_id')
-    repair_amount = data.get('repair_amount', 1.0)  # Default to full repair
+    unit_type = req.unit_type
+    unit_id = req.unit_id
+    repair_amount = req.repair_amount
     
     if unit_type == 'mech':
         unit = PlayerMech.query.filter_by(id=unit_id, player_id=player.id).first()
@@ -626,26 +858,22 @@ def repair_unit():
     # Perform repair
     player.spend_credits(repair_cost)
     unit.repair(repair_amount)
+    player.bump_cache_version()
     
     db.session.commit()
     
     return jsonify({
         'success': True,
         'message': f'Successfully repaired {unit.get_display_name()} for {repair_cost} credits.',
-        'player': player.to_dict(),
+        'player': player_dict(player),
         'unit': unit.to_dict()
     })
 
 @app.route('/rename_unit', methods=['POST'])
+@require_player()
 def rename_unit():
     """Rename a mech or vehicle."""
-    player_id = session.get('player_id')
-    if not player_id:
-        return jsonify({'success': False, 'message': 'No character loaded.'})
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'success': False, 'message': 'Character not found.'})
+    player = g.player
     
     data = request.get_json()
     unit_type = data.get('unit_type')
@@ -670,6 +898,7 @@ def rename_unit():
     
     old_name = unit.get_display_name()
     unit.custom_name = new_name
+    player.bump_cache_version()
     
     db.session.commit()
     
@@ -1,88 +1,49 @@
 import random
-import json
-from datetime import datetime
-from models import db, Player, MechTemplate, PlayerMech, VehicleTemplate, PlayerVehicle
+import orjson
+import functools
+import numpy as np
+from models import PlayerMech
+from game_logic import (
+    BattleTechGame, EncounterResult, ENCOUNTERS, ENCOUNTER_VIEWS,
+    DIFFICULTY_MIN_LEVEL, MAX_ENCOUNTER_LEVEL, _success_chance
+)
 
-class GameEngine:
+# Vectorized damage rolls for a whole stable of mechs at once
+_RNG = np.random.default_rng()
+
+class GameEngine(BattleTechGame):
     """Main game engine for BattleTech MUD."""
     
     def __init__(self):
+        # Starting mechs, their index and the terrain helpers come from BattleTechGame;
+        # encounters and missions live here only
+        super().__init__()
         self.encounters = self._load_encounters()
+        self._encounters_by_level = self._bucket_encounters_by_level()
         self.missions = self._load_missions()
-        self.starting_mechs = self._load_starting_mechs()
     
     def _load_encounters(self):
         """Load encounter data."""
+        return ENCOUNTERS
+    
+    def _bucket_encounters_by_level(self):
+        """Precompute the encounter ids open to each player level."""
         return {
-            'pirate_patrol': {
-                'name': 'Pirate Patrol',
-                'description': 'A small pirate patrol blocks your path.',
-                'difficulty': 'easy',
-                'reward_credits': (1000, 3000),
-                'reward_experience': (200, 500),
-                'success_chance': 0.7,
-                'terrain_modifier': {
-                    'forest': 0.1,
-                    'mountains': -0.1,
-                    'desert': 0.05
-                }
-            },
-            'salvage_opportunity': {
-                'name': 'Salvage Opportunity',
-                'description': 'You discover abandoned military equipment.',
-                'difficulty': 'easy',
-                'reward_credits': (2000, 5000),
-                'reward_experience': (50, 150),
-                'success_chance': 0.8,
-                'terrain_modifier': {
-                    'hills': 0.1,
-                    'plains': 0.05
-                }
-            },
-            'mercenary_contract': {
-                'name': 'Mercenary Contract',
-                'description': 'A local faction offers you a contract.',
-                'difficulty': 'medium',
-                'reward_credits': (5000, 10000),
-                'reward_experience': (1000, 3000),
-                'success_chance': 0.6,
-                'terrain_modifier': {
-                    'plains': 0.1,
-                    'desert': 0.05
-                }
-            },
-            'bandit_ambush': {
-                'name': 'Bandit Ambush',
-                'description': 'Bandits attempt to ambush you!',
-                'difficulty': 'hard',
-                'reward_credits': (3000, 8000),
-                'reward_experience': (300, 800),
-                'success_chance': 0.5,
-                'terrain_modifier': {
-                    'forest': -0.2,
-                    'jungle': -0.15,
-                    'mountains': -0.1
-                }
-            },
-            'mech_duel': {
-                'name': 'Mech Duel Challenge',
-                'description': 'Another MechWarrior challenges you to single combat.',
-                'difficulty': 'hard',
-                'reward_credits': (8000, 15000),
-                'reward_experience': (2000, 5000),
-                'success_chance': 0.4,
-                'terrain_modifier': {
-                    'plains': 0.1,
-                    'desert': 0.05
-                }
-            }
+            level: tuple(
+                encounter_id for encounter_id, encounter in self.encounters.items()
+                if DIFFICULTY_MIN_LEVEL.get(encounter['difficulty'], 2) <= level
+            )
+            for level in range(1, MAX_ENCOUNTER_LEVEL + 1)
         }
     
-    def _load_missions(self):
+    # The catalogs are parsed once per process and shared by every engine instance
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _load_missions():
         """Load mission data from JSON file."""
         try:
-            with open('data/missions.json', 'r') as f:
-                return json.load(f)
+            with open('data/missions.json', 'rb') as f:
+                return orjson.loads(f.read())
         except FileNotFoundError:
             print("Warning: missions.json not found, using default missions")
             return {
@@ -102,121 +63,19 @@ class GameEngine:
                     }
                 }
             }
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"Error parsing missions.json: {e}")
             return {}
     
-    def _load_starting_mechs(self):
-        """Load starting mech options for new players."""
-        try:
-            with open('data/mechs.json', 'r') as f:
-                mechs_data = json.load(f)
-            
-            # Filter for the three starting mechs: Locust, Wasp, Stinger
-            starting_mech_names = ['Locust', 'Wasp', 'Stinger']
-            starting_mechs = []
-            
-            for mech in mechs_data['mechs']:
-                if mech['name'] in starting_mech_names:
-                    # Use value from Excel if available, otherwise calculate price
-                    if 'value' in mech:
-                        mech['price'] = mech['value']
-                    else:
-                        mech['price'] = mech['tonnage'] * 50 + mech['battle_value'] * 2
-                    
-                    starting_mechs.append(mech)
-            
-            return starting_mechs
-        except FileNotFoundError:
-            print("Warning: mechs.json not found, using default starting mechs")
-            return []
-        except json.JSONDecodeError as e:
-            print(f"Error parsing mechs.json: {e}")
-            return []
-    
-    def get_starting_mechs(self):
-        """Get available starting mechs for new players."""
-        return self.starting_mechs
-    
-    def assign_starting_mech(self, player, mech_name):
-        """Assign a starting mech to a new player."""
-        # Find the selected mech
-        selected_mech = None
-        for mech in self.starting_mechs:
-            if mech['name'] == mech_name:
-                selected_mech = mech
-                break
-        
-        if not selected_mech:
-            return {'success': False, 'message': 'Starting mech not found.'}
-        
-        try:
-            # Create or find mech template
-            template = MechTemplate.query.filter_by(name=selected_mech['name'], model=selected_mech['model']).first()
-            if not template:
-                template = MechTemplate(
-                    name=selected_mech['name'],
-                    model=selected_mech['model'],
-                    tonnage=selected_mech['tonnage'],
-                    battle_value=selected_mech['battle_value'],
-                    price=selected_mech['price']
-                )
-                template.set_specs(selected_mech)
-                db.session.add(template)
-                db.session.flush()  # Get the ID
-            
-            # Create the player mech
-            player_mech = PlayerMech(
-                player_id=player.id,
-                template_id=template.id
-            )
-            db.session.add(player_mech)
-            db.session.flush()  # Get the mech ID
-            
-            # Set as active mech and refresh movement points
-            player.active_mech_id = player_mech.id
-            player.movement_points_remaining = player.get_movement_points()
-            
-            db.session.commit()
-            
-            return {
-                'success': True,
-                'message': f'Starting mech {selected_mech["name"]} assigned successfully!',
-                'mech': player_mech.to_dict()
-            }
-            
-        except Exception as e:
-            db.session.rollback()
-            return {'success': False, 'message': f'Error assigning starting mech: {str(e)}'}
-
     def calculate_success_chance(self, player, encounter_type, terrain_type):
         """Calculate success chance for an encounter."""
-        encounter = self.encounters.get(encounter_type)
-        if not encounter:
-            return 0.0
-
-        base_chance = encounter['success_chance']
-        
-        # Skill modifiers (lower is better in BattleTech)
-        gunnery_bonus = (8 - player.gunnery) * 0.05    # Combat accuracy
-        piloting_bonus = (8 - player.piloting) * 0.03  # Mech control
-        guts_bonus = (8 - player.guts) * 0.02          # Morale and staying power
-        tactics_bonus = (8 - player.tactics) * 0.03    # Strategic thinking
-        
-        # Experience modifier
-        experience_bonus = min(player.level * 0.02, 0.1)  # Max 10% bonus
-        
-        # Terrain modifier
-        terrain_modifier = encounter.get('terrain_modifier', {}).get(terrain_type, 0.0)
-        
-        # Mech advantage
-        mech_bonus = 0.1 if player.mechs else 0.0
-        
-        total_chance = base_chance + gunnery_bonus + piloting_bonus + guts_bonus + tactics_bonus + experience_bonus + terrain_modifier + mech_bonus
-        
-        return max(0.1, min(0.95, total_chance))  # Clamp between 10% and 95%
+        return _success_chance(
+            player.gunnery, player.piloting, player.guts, player.tactics,
+            player.level, bool(player.mechs), encounter_type, terrain_type
+        )
 
-    def calculate_mission_rewards(self, mission, player_level):
+    @staticmethod
+    def calculate_mission_rewards(mission, player_level):
         """Calculate mission rewards based on player level."""
         base_credits = mission.get('base_reward_credits', 0)
         base_experience = mission.get('base_reward_experience', 0)
@@ -240,39 +99,47 @@ class GameEngine:
     
     def generate_encounter(self, player, terrain_type):
         """Generate a random encounter based on terrain and player level."""
-        # Filter encounters by difficulty vs player level
-        available_encounters = []
-        
-        for encounter_id, encounter in self.encounters.items():
-            if encounter['difficulty'] == 'easy' or player.level >= 2:
-                if encounter['difficulty'] == 'medium' and player.level < 3:
-                    continue
-                if encounter['difficulty'] == 'hard' and player.level < 4:
-                    continue
-                available_encounters.append(encounter_id)
+        # Encounters open to the player's level were bucketed at startup
+        level = max(1, min(player.level, MAX_ENCOUNTER_LEVEL))
+        available_encounters = self._encounters_by_level[level]
         
         if not available_encounters:
             return None
         
+        # Only the player's success chance differs from the shared view
         encounter_id = random.choice(available_encounters)
-        encounter = self.encounters[encounter_id].copy()
-        encounter['id'] = encounter_id
-        encounter['success_chance'] = self.calculate_success_chance(player, encounter_id, terrain_type)
+        success_chance = self.calculate_success_chance(player, encounter_id, terrain_type)
         
-        return encounter
+        return dict(ENCOUNTER_VIEWS[encounter_id], success_chance=success_chance)
+    
+    def is_encounter_available(self, player, encounter_id):
+        """Check that an encounter id exists and is open to the player's level."""
+        level = max(1, min(player.level, MAX_ENCOUNTER_LEVEL))
+        return encounter_id in self._encounters_by_level[level]
     
-    def resolve_encounter(self, player, encounter, choice='engage'):
+    def _damage_operational_mechs(self, player, armor_range, internal_range=None):
+        """Damage every operational mech, rolling each damage type once for the whole group."""
+        operational = [mech for mech in player.mechs if mech.is_operational()]
+        if not operational:
+            return
+        
+        armor_damage = _RNG.uniform(*armor_range, size=len(operational)).tolist()
+        internal_damage = _RNG.uniform(*internal_range, size=len(operational)).tolist() if internal_range else None
+        PlayerMech.take_damage_batch(operational, armor_damage, internal_damage)
+    
+    def resolve_encounter(self, player, encounter_id, terrain_type=None, choice='engage'):
         """Resolve an encounter and return results."""
+        # Everything but the id comes from the server's table, never from the client
+        encounter = self.encounters.get(encounter_id)
+        if encounter is None:
+            return EncounterResult(False, 'Unknown encounter.')
+        
         if choice == 'flee':
-            return {
-                'success': True,
-                'message': f"You successfully fled from the {encounter['name']}.",
-                'rewards': {'credits': 0, 'experience': 0}
-            }
+            return EncounterResult(True, f"You successfully fled from the {encounter['name']}.", 0, 0)
         
-        # Roll for success
+        # Roll for success against a chance computed here
         success_roll = random.random()
-        success = success_roll <= encounter['success_chance']
+        success = success_roll <= self.calculate_success_chance(player, encounter_id, terrain_type)
         
         if success:
             # Calculate rewards
@@ -287,75 +154,32 @@ class GameEngine:
             leveled_up = player.gain_experience(experience)
             
             # Damage mechs slightly on success
-            if player.mechs:
-                for mech in player.mechs:
-                    if mech.is_operational():
-                        damage = random.uniform(0.01, 0.05)  # 1-5% damage
-                        mech.take_damage(armor_damage=damage)
+            self._damage_operational_mechs(player, (0.01, 0.05))  # 1-5% damage
             
             message = f"Victory! You defeated the {encounter['name']} and earned {credits} credits and {experience} XP."
             if leveled_up:
                 message += f" You leveled up to level {player.level}!"
             
-            return {
-                'success': True,
-                'message': message,
-                'rewards': {'credits': credits, 'experience': experience},
-                'leveled_up': leveled_up
-            }
+            return EncounterResult(True, message, credits, experience, leveled_up)
         else:
             # Failure - take damage and lose some credits
             credits_lost = random.randint(50, 200)
             player.spend_credits(credits_lost)
             
-            # Damage mechs more on failure
-            if player.mechs:
-                for mech in player.mechs:
-                    if mech.is_operational():
-                        armor_damage = random.uniform(0.05, 0.15)  # 5-15% armor damage
-                        internal_damage = random.uniform(0.01, 0.05)  # 1-5% internal damage
-                        mech.take_damage(armor_damage=armor_damage, internal_damage=internal_damage)
+            # Damage mechs more on failure: 5-15% armor, 1-5% internal
+            self._damage_operational_mechs(player, (0.05, 0.15), (0.01, 0.05))
             
             message = f"Defeat! The {encounter['name']} got the better of you. You lost {credits_lost} credits and your mechs took damage."
             
-            return {
-                'success': False,
-                'message': message,
-                'rewards': {'credits': -credits_lost, 'experience': 0}
-            }
+            return EncounterResult(False, message, -credits_lost, 0)
     
     def get_available_missions(self, player):
         """Get missions available to the player."""
-        available = []
         declined_missions = player.get_declined_missions()
         
-        for mission_id, mission in self.missions.items():
-            # Skip if mission has been declined
-            if mission_id in declined_missions:
-                continue
-                
-            requirements = mission.get('requirements', {})
-            
-            # Check level requirement
-            if player.level < requirements.get('min_level', 1):
-                continue
-            
-            # Check mech requirement
-            operational_mechs = sum(1 for mech in player.mechs if mech.is_operational())
-            if operational_mechs < requirements.get('mechs_required', 0):
-                continue
-            
-            mission_copy = mission.copy()
-            mission_copy['id'] = mission_id
-            
-            # Add level-scaled rewards for display
-            rewards = self.calculate_mission_rewards(mission, player.level)
-            mission_copy['scaled_reward_credits'] = rewards['credits']
-            mission_copy['scaled_reward_experience'] = rewards['experience']
-            
-            available.append(mission_copy)
-        
-        return available
+        # Only the declined filter is per player; the rest is cached per level and mech count
+        missions = _missions_for(player.level, player.operational_mech_count or 0)
+        return [mission for mission in missions if mission['id'] not in declined_missions]
     
     def decline_mission(self, player, mission_id):
         """Decline a mission (add it to declined list)."""
@@ -369,16 +193,16 @@ class GameEngine:
         """Start a mission for the player."""
         mission = self.missions.get(mission_id)
         if not mission:
-            return {'success': False, 'message': 'Mission not found.'}
+            return EncounterResult(False, 'Mission not found.')
         
         # Check requirements again
         requirements = mission.get('requirements', {})
         if player.level < requirements.get('min_level', 1):
-            return {'success': False, 'message': 'You do not meet the level requirement.'}
+            return EncounterResult(False, 'You do not meet the level requirement.')
         
-        operational_mechs = sum(1 for mech in player.mechs if mech.is_operational())
+        operational_mechs = player.operational_mech_count or 0
         if operational_mechs < requirements.get('mechs_required', 0):
-            return {'success': False, 'message': 'You do not have enough operational mechs.'}
+            return EncounterResult(False, 'You do not have enough operational mechs.')
         
         # For now, auto-complete missions (could be expanded to multi-turn missions)
         success_chance = 0.6 + (player.level * 0.05) + (operational_mechs * 0.1)
@@ -394,78 +218,50 @@ class GameEngine:
             leveled_up = player.gain_experience(rewards['experience'])
             
             # Light damage to mechs
-            if player.mechs:
-                for mech in player.mechs:
-                    if mech.is_operational():
-                        damage = random.uniform(0.02, 0.08)  # 2-8% damage
-                        mech.take_damage(armor_damage=damage)
+            self._damage_operational_mechs(player, (0.02, 0.08))  # 2-8% damage
             
             message = f"Mission '{mission['name']}' completed successfully! Earned {rewards['credits']:,} credits and {rewards['experience']:,} XP."
             if leveled_up:
                 message += f" You leveled up to level {player.level}!"
             
-            return {
-                'success': True,
-                'message': message,
-                'rewards': rewards,
-                'leveled_up': leveled_up
-            }
+            return EncounterResult(True, message, rewards['credits'], rewards['experience'], leveled_up)
         else:
             # Mission failed
             credits_lost = random.randint(100, 300)
             player.spend_credits(credits_lost)
             
-            # More damage on failure
-            if player.mechs:
-                for mech in player.mechs:
-                    if mech.is_operational():
-                        armor_damage = random.uniform(0.1, 0.2)  # 10-20% armor damage
-                        internal_damage = random.uniform(0.02, 0.08)  # 2-8% internal damage
-                        mech.take_damage(armor_damage=armor_damage, internal_damage=internal_damage)
+            # More damage on failure: 10-20% armor, 2-8% internal
+            self._damage_operational_mechs(player, (0.1, 0.2), (0.02, 0.08))
             
             message = f"Mission '{mission['name']}' failed. You lost {credits_lost} credits and your mechs took heavy damage."
             
-            return {
-                'success': False,
-                'message': message,
-                'rewards': {'credits': -credits_lost, 'experience': 0}
-            }
-    
-    def get_terrain_movement_cost(self, terrain_type):
-        """Get movement cost for different terrain types."""
-        costs = {
-            'plains': 1,
-            'forest': 2,
-            'hills': 2,
-            'mountains': 3,
-            'desert': 2,
-            'jungle': 3,
-            'tundra': 2,
-            'beach': 1,
-            'shallow_water': 4,
-            'deep_ocean': 10,  # Very expensive
-            'snow_peaks': 5
-        }
-        return costs.get(terrain_type, 1)
+            return EncounterResult(False, message, -credits_lost, 0)
+
+@functools.lru_cache(maxsize=128)
+def _missions_for(level, operational_mechs):
+    """Build the mission views open to a level and mech count (shared, never mutate)."""
+    # Module level so the cache is keyed on the inputs alone and holds no engine instance
+    available = []
     
-    def can_move_to_terrain(self, terrain_type):
-        """Check if terrain is passable."""
-        impassable = ['deep_ocean']
-        return terrain_type not in impassable
+    for mission_id, mission in GameEngine._load_missions().items():
+        requirements = mission.get('requirements', {})
+        
+        # Check level requirement
+        if level < requirements.get('min_level', 1):
+            continue
+        
+        # Check mech requirement
+        if operational_mechs < requirements.get('mechs_required', 0):
+            continue
+        
+        mission_copy = mission.copy()
+        mission_copy['id'] = mission_id
+        
+        # Add level-scaled rewards for display
+        rewards = GameEngine.calculate_mission_rewards(mission, level)
+        mission_copy['scaled_reward_credits'] = rewards['credits']
+        mission_copy['scaled_reward_experience'] = rewards['experience']
+        
+        available.append(mission_copy)
     
-    def get_encounter_chance(self, terrain_type):
-        """Get encounter chance for terrain type."""
-        chances = {
-            'plains': 0.3,
-            'forest': 0.4,
-            'hills': 0.35,
-            'mountains': 0.25,
-            'desert': 0.3,
-            'jungle': 0.45,
-            'tundra': 0.2,
-            'beach': 0.1,
-            'shallow_water': 0.1,
-            'deep_ocean': 0.05,
-            'snow_peaks': 0.15
-        }
-        return chances.get(terrain_type, 0.2) 
\ No newline at end of file
+    return tuple(available)
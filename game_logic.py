@@ -1,61 +1,227 @@
-import random
-import json
-from datetime import datetime
+import functools
+import orjson
+import numpy as np
+from dataclasses import dataclass
 from models import db, MechTemplate, PlayerMech
 
+# Terrain tables, kept at module level so hot paths can read them directly
+TERRAIN_MOVEMENT_COSTS = {
+    'plains': 1,
+    'forest': 2,
+    'hills': 2,
+    'mountains': 3,
+    'desert': 2,
+    'jungle': 3,
+    'tundra': 2,
+    'beach': 1,
+    'shallow_water': 4,
+    'deep_ocean': 10,
+    'snow_peaks': 5
+}
+
+TERRAIN_ENCOUNTER_CHANCES = {
+    'plains': 0.3,
+    'forest': 0.4,
+    'hills': 0.35,
+    'mountains': 0.25,
+    'desert': 0.3,
+    'jungle': 0.45,
+    'tundra': 0.2,
+    'beach': 0.1,
+    'shallow_water': 0.1,
+    'deep_ocean': 0.05,
+    'snow_peaks': 0.15
+}
+
+IMPASSABLE_TERRAIN = frozenset(['deep_ocean'])
+
+# Compact integer ids per terrain type, so bulk path costs can index an array
+TERRAIN_IDS = {terrain_type: terrain_id for terrain_id, terrain_type in enumerate(TERRAIN_MOVEMENT_COSTS)}
+TERRAIN_COST_ARRAY = np.array(list(TERRAIN_MOVEMENT_COSTS.values()), dtype=np.uint8)
+TERRAIN_COST_ARRAY.flags.writeable = False
+
+# Encounter table shared by every engine instance
+ENCOUNTERS = {
+    'pirate_patrol': {
+        'name': 'Pirate Patrol',
+        'description': 'A small pirate patrol blocks your path.',
+        'difficulty': 'easy',
+        'reward_credits': (1000, 3000),
+        'reward_experience': (200, 500),
+        'success_chance': 0.7,
+        'terrain_modifier': {
+            'forest': 0.1,
+            'mountains': -0.1,
+            'desert': 0.05
+        }
+    },
+    'salvage_opportunity': {
+        'name': 'Salvage Opportunity',
+        'description': 'You discover abandoned military equipment.',
+        'difficulty': 'easy',
+        'reward_credits': (2000, 5000),
+        'reward_experience': (50, 150),
+        'success_chance': 0.8,
+        'terrain_modifier': {
+            'hills': 0.1,
+            'plains': 0.05
+        }
+    },
+    'mercenary_contract': {
+        'name': 'Mercenary Contract',
+        'description': 'A local faction offers you a contract.',
+        'difficulty': 'medium',
+        'reward_credits': (5000, 10000),
+        'reward_experience': (1000, 3000),
+        'success_chance': 0.6,
+        'terrain_modifier': {
+            'plains': 0.1,
+            'desert': 0.05
+        }
+    },
+    'bandit_ambush': {
+        'name': 'Bandit Ambush',
+        'description': 'Bandits attempt to ambush you!',
+        'difficulty': 'hard',
+        'reward_credits': (3000, 8000),
+        'reward_experience': (300, 800),
+        'success_chance': 0.5,
+        'terrain_modifier': {
+            'forest': -0.2,
+            'jungle': -0.15,
+            'mountains': -0.1
+        }
+    },
+    'mech_duel': {
+        'name': 'Mech Duel Challenge',
+        'description': 'Another MechWarrior challenges you to single combat.',
+        'difficulty': 'hard',
+        'reward_credits': (8000, 15000),
+        'reward_experience': (2000, 5000),
+        'success_chance': 0.4,
+        'terrain_modifier': {
+            'plains': 0.1,
+            'desert': 0.05
+        }
+    }
+}
+
+# Client-facing encounter dicts with their id filled in; shared, so never mutate them
+ENCOUNTER_VIEWS = {encounter_id: dict(encounter, id=encounter_id) for encounter_id, encounter in ENCOUNTERS.items()}
+
+# Lowest player level that may meet each difficulty; any other difficulty opens at level 2
+DIFFICULTY_MIN_LEVEL = {
+    'easy': 1,
+    'medium': 3,
+    'hard': 4
+}
+
+# Every difficulty gate is open from this level on, so higher levels share its bucket
+MAX_ENCOUNTER_LEVEL = max(DIFFICULTY_MIN_LEVEL.values())
+
+# Base success chance with the terrain modifier already folded in, per (encounter, terrain)
+ENCOUNTER_TERRAIN_CHANCES = {
+    (encounter_id, terrain_type): encounter['success_chance'] + encounter.get('terrain_modifier', {}).get(terrain_type, 0.0)
+    for encounter_id, encounter in ENCOUNTERS.items()
+    for terrain_type in TERRAIN_MOVEMENT_COSTS
+}
+
+@functools.lru_cache(maxsize=4096)
+def _success_chance(gunnery, piloting, guts, tactics, level, has_mechs, encounter_type, terrain_type):
+    """Pure success chance calculation, memoized on every input it depends on."""
+    # Base chance and terrain modifier in one lookup; unknown terrain falls back
+    base_chance = ENCOUNTER_TERRAIN_CHANCES.get((encounter_type, terrain_type))
+    if base_chance is None:
+        encounter = ENCOUNTERS.get(encounter_type)
+        if not encounter:
+            return 0.0
+        base_chance = encounter['success_chance'] + encounter.get('terrain_modifier', {}).get(terrain_type, 0.0)
+    
+    # Skill modifiers (lower is better in BattleTech)
+    gunnery_bonus = (8 - gunnery) * 0.05    # Combat accuracy
+    piloting_bonus = (8 - piloting) * 0.03  # Mech control
+    guts_bonus = (8 - guts) * 0.02          # Morale and staying power
+    tactics_bonus = (8 - tactics) * 0.03    # Strategic thinking
+    
+    # Experience modifier
+    experience_bonus = min(level * 0.02, 0.1)  # Max 10% bonus
+    
+    # Mech advantage
+    mech_bonus = 0.1 if has_mechs else 0.0
+    
+    total_chance = base_chance + gunnery_bonus + piloting_bonus + guts_bonus + tactics_bonus + experience_bonus + mech_bonus
+    
+    # Clamp between 10% and 95% without the max()/min() calls
+    return 0.1 if total_chance < 0.1 else 0.95 if total_chance > 0.95 else total_chance
+
+@dataclass(slots=True)
+class EncounterResult:
+    """Outcome of an encounter or mission."""
+    success: bool
+    message: str
+    credits: int = 0
+    experience: int = 0
+    leveled_up: bool = False
+    
+    @property
+    def rewards(self):
+        """Rewards in the shape sent to the client."""
+        return {'credits': self.credits, 'experience': self.experience}
+    
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization."""
+        return {
+            'success': self.success,
+            'message': self.message,
+            'rewards': self.rewards,
+            'leveled_up': self.leveled_up
+        }
+
 class BattleTechGame:
-    """Simplified BattleTech game logic."""
+    """Shared game rules: starting mechs and terrain."""
     
     def __init__(self):
-        self.encounters = {
-            'pirate_patrol': {
-                'name': 'Pirate Patrol',
-                'description': 'A small pirate patrol blocks your path.',
-                'reward_credits': (500, 1000),
-                'reward_experience': (50, 150),
-                'success_chance': 0.7
-            },
-            'salvage_opportunity': {
-                'name': 'Salvage Opportunity', 
-                'description': 'You discover abandoned military equipment.',
-                'reward_credits': (1500, 4000),
-                'reward_experience': (25, 75),
-                'success_chance': 0.8
-            },
-            'mercenary_contract': {
-                'name': 'Mercenary Contract',
-                'description': 'A local faction offers you a contract.',
-                'reward_credits': (2500, 10000),
-                'reward_experience': (100, 300),
-                'success_chance': 0.6
-            }
-        }
         self.starting_mechs = self._load_starting_mechs()
+        
+        # Index by name, keeping the first entry for a name as the scan did
+        self._starting_mech_index = {}
+        for mech in self.starting_mechs:
+            self._starting_mech_index.setdefault(mech['name'], mech)
+        
+        # Template specs are serialized once here rather than on every assignment
+        self._starting_mech_specs = {
+            name: orjson.dumps(mech).decode('utf-8') for name, mech in self._starting_mech_index.items()
+        }
     
-    def _load_starting_mechs(self):
-        """Load starting mechs from mechs.json."""
+    # Parsed once per process and shared by every game instance
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _load_starting_mechs():
+        """Load starting mech options for new players."""
         try:
-            with open('data/mechs.json', 'r') as f:
-                data = json.load(f)
+            with open('data/mechs.json', 'rb') as f:
+                mechs_data = orjson.loads(f.read())
             
-            # Handle the "mechs" wrapper array
-            all_mechs = data.get('mechs', [])
-            
-            # Filter for starting mechs: Locust, Wasp, Stinger
-            starting_mech_names = ['Locust', 'Wasp', 'Stinger']
+            # Filter for the three starting mechs: Locust, Wasp, Stinger
+            starting_mech_names = {'Locust', 'Wasp', 'Stinger'}
             starting_mechs = []
             
-            for mech in all_mechs:
+            for mech in mechs_data['mechs']:
                 if mech['name'] in starting_mech_names:
-                    # Calculate price if not present
-                    if 'price' not in mech:
-                        base_price = mech.get('tonnage', 20) * 1000
-                        mech['price'] = base_price
+                    # Use value from Excel if available, otherwise calculate price
+                    if 'value' in mech:
+                        mech['price'] = mech['value']
+                    else:
+                        mech['price'] = mech['tonnage'] * 50 + mech['battle_value'] * 2
+                    
                     starting_mechs.append(mech)
             
             return starting_mechs
-        except Exception as e:
-            print(f"Error loading starting mechs: {e}")
+        except FileNotFoundError:
+            print("Warning: mechs.json not found, using default starting mechs")
+            return []
+        except orjson.JSONDecodeError as e:
+            print(f"Error parsing mechs.json: {e}")
             return []
     
     def get_starting_mechs(self):
@@ -66,17 +232,13 @@ class BattleTechGame:
         """Assign a starting mech to a player."""
         try:
             # Find the mech template
-            mech_template = None
-            for mech in self.starting_mechs:
-                if mech['name'] == mech_name:
-                    mech_template = mech
-                    break
+            mech_template = self._starting_mech_index.get(mech_name)
             
             if not mech_template:
                 return {'success': False, 'message': f'Starting mech "{mech_name}" not found.'}
             
             # Check if MechTemplate exists, create if not
-            template = MechTemplate.query.filter_by(name=mech_name).first()
+            template = MechTemplate.find(mech_name, mech_template['model'])
             if not template:
                 template = MechTemplate(
                     name=mech_name,
@@ -84,128 +246,40 @@ class BattleTechGame:
                     tonnage=mech_template['tonnage'],
                     battle_value=mech_template.get('battle_value', 0),
                     price=mech_template.get('price', mech_template['tonnage'] * 1000),
-                    specs=json.dumps(mech_template)
+                    specs=self._starting_mech_specs[mech_name]
                 )
-                db.session.add(template)
-                db.session.flush()
             
-            # Create PlayerMech instance
+            # Create PlayerMech instance; linking objects lets the caller's commit
+            # insert the template and mech in a single flush
             player_mech = PlayerMech(
-                player_id=player.id,
-                template_id=template.id,
+                owner=player,
+                template=template,
                 custom_name=f"{player.name}'s {mech_name}"
             )
             
             db.session.add(player_mech)
-            db.session.flush()
+            player.adjust_operational_mech_count(1)
             
             # Set as active mech
-            player.active_mech_id = player_mech.id
+            player.active_mech = player_mech
             
             return {'success': True, 'message': f'Successfully assigned {mech_name} to {player.name}.'}
             
         except Exception as e:
             return {'success': False, 'message': f'Error assigning starting mech: {str(e)}'}
     
-    def calculate_success_chance(self, player, encounter_type):
-        """Calculate success chance for an encounter."""
-        base_chance = self.encounters[encounter_type]['success_chance']
-        
-        # Skill modifiers (lower is better in BattleTech)
-        gunnery_bonus = (8 - player.gunnery) * 0.05    # Combat accuracy
-        piloting_bonus = (8 - player.piloting) * 0.03  # Mech control
-        guts_bonus = (8 - player.guts) * 0.02          # Morale and staying power
-        tactics_bonus = (8 - player.tactics) * 0.03    # Strategic thinking
-        
-        # Experience modifier
-        experience_bonus = min(player.level * 0.02, 0.1)
-        
-        # Mech advantage
-        mech_bonus = 0.1 if player.mechs else 0.0
-        
-        total_chance = base_chance + gunnery_bonus + piloting_bonus + guts_bonus + tactics_bonus + experience_bonus + mech_bonus
-        
-        return max(0.1, min(0.95, total_chance))
-    
-    def generate_encounter(self, terrain_type):
-        """Generate a random encounter."""
-        encounter_id = random.choice(list(self.encounters.keys()))
-        encounter = self.encounters[encounter_id].copy()
-        encounter['id'] = encounter_id
-        return encounter
-    
-    def resolve_encounter(self, player, encounter):
-        """Resolve an encounter."""
-        success_chance = self.calculate_success_chance(player, encounter['id'])
-        success = random.random() <= success_chance
-        
-        if success:
-            credit_range = encounter['reward_credits']
-            exp_range = encounter['reward_experience']
-            
-            credits = random.randint(credit_range[0], credit_range[1])
-            experience = random.randint(exp_range[0], exp_range[1])
-            
-            player.earn_credits(credits)
-            leveled_up = player.gain_experience(experience)
-            
-            message = f"Victory! You earned {credits} credits and {experience} XP."
-            if leveled_up:
-                message += f" You leveled up to level {player.level}!"
-            
-            return {
-                'success': True,
-                'message': message,
-                'rewards': {'credits': credits, 'experience': experience},
-                'leveled_up': leveled_up
-            }
-        else:
-            credits_lost = random.randint(50, 200)
-            player.spend_credits(credits_lost)
-            
-            message = f"Defeat! You lost {credits_lost} credits."
-            
-            return {
-                'success': False,
-                'message': message,
-                'rewards': {'credits': -credits_lost, 'experience': 0}
-            }
-    
     def get_terrain_movement_cost(self, terrain_type):
         """Get movement cost for different terrain types."""
-        costs = {
-            'plains': 1,
-            'forest': 2,
-            'hills': 2,
-            'mountains': 3,
-            'desert': 2,
-            'jungle': 3,
-            'tundra': 2,
-            'beach': 1,
-            'shallow_water': 4,
-            'deep_ocean': 10,
-            'snow_peaks': 5
-        }
-        return costs.get(terrain_type, 1)
+        return TERRAIN_MOVEMENT_COSTS.get(terrain_type, 1)
+    
+    def get_terrain_cost_array(self):
+        """Get movement costs as a read-only array indexed by TERRAIN_IDS."""
+        return TERRAIN_COST_ARRAY
     
     def can_move_to_terrain(self, terrain_type):
         """Check if terrain is passable."""
-        impassable = ['deep_ocean']
-        return terrain_type not in impassable
+        return terrain_type not in IMPASSABLE_TERRAIN
     
     def get_encounter_chance(self, terrain_type):
         """Get encounter chance for terrain type."""
-        chances = {
-            'plains': 0.3,
-            'forest': 0.4,
-            'hills': 0.35,
-            'mountains': 0.25,
-            'desert': 0.3,
-            'jungle': 0.45,
-            'tundra': 0.2,
-            'beach': 0.1,
-            'shallow_water': 0.1,
-            'deep_ocean': 0.05,
-            'snow_peaks': 0.15
-        }
-        return chances.get(terrain_type, 0.2) 
\ No newline at end of file
+        return TERRAIN_ENCOUNTER_CHANCES.get(terrain_type, 0.2) 
\ No newline at end of file
@@ -73,13 +73,14 @@ def init_vehicles():
         }
     ]
     
+    # Check which vehicles already exist in a single query
+    existing_names = set(db.session.scalars(
+        db.select(VehicleTemplate.name).where(VehicleTemplate.name.in_([v['name'] for v in vehicles]))
+    ))
+    
+    new_vehicles = []
     for vehicle_data in vehicles:
-        # Check if vehicle already exists
-        existing = VehicleTemplate.query.filter_by(
-            name=vehicle_data['name']
-        ).first()
-        
-        if not existing:
+        if vehicle_data['name'] not in existing_names:
             vehicle = VehicleTemplate(
                 name=vehicle_data['name'],
                 vehicle_type=vehicle_data['vehicle_type'],
@@ -88,11 +89,13 @@ def init_vehicles():
                 price=vehicle_data['price']
             )
             vehicle.set_specs(vehicle_data['specs'])
-            db.session.add(vehicle)
+            new_vehicles.append(vehicle)
             print(f"Added vehicle: {vehicle_data['name']}")
         else:
             print(f"Vehicle already exists: {vehicle_data['name']}")
     
+    # Inserted together in one batched flush
+    db.session.add_all(new_vehicles)
     db.session.commit()
     print("Vehicle initialization complete.")
 
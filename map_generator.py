@@ -1,19 +1,82 @@
 from simplex_noise import SimplexNoise
 import math
-import random
+import numpy as np
 from collections import deque
+from dataclasses import dataclass
+
+# Biomes whose color comes from elevation rather than local noise
+WATER_BIOMES = frozenset(['deep_ocean', 'shallow_water'])
+
+# Orthogonal neighbor offsets (NSEW) followed by the diagonals
+NEIGHBOR_OFFSETS = ((0,-1), (0,1), (-1,0), (1,0), (-1,-1), (-1,1), (1,-1), (1,1))
+
+# Terrain codes stored per cell; rivers are painted over the biomes last
+TERRAIN_TYPES = (
+    'deep_ocean', 'shallow_water', 'beach', 'tundra', 'desert', 'plains',
+    'forest', 'jungle', 'hills', 'mountains', 'snow_peaks', 'river'
+)
+TERRAIN_CODES = {terrain_type: code for code, terrain_type in enumerate(TERRAIN_TYPES)}
+TERRAIN_NAME_LUT = np.array(TERRAIN_TYPES)
+
+# Land biome for each of the five quantized climate zones, coldest first
+CLIMATE_ZONE_BIOMES = np.array([TERRAIN_CODES[biome] for biome in ('tundra', 'desert', 'plains', 'forest', 'jungle')], dtype=np.uint8)
+
+@dataclass
+class MapData:
+    """Generated map held as one array per cell attribute."""
+    elevation: np.ndarray
+    climate: np.ndarray
+    terrain: np.ndarray      # uint8 code into TERRAIN_TYPES
+    color_index: np.ndarray  # uint8 index into that terrain's palette
+    palette_lut: np.ndarray  # colors indexed by [terrain code, palette index]
+    
+    def to_rows(self):
+        """Expand into the rows of cell dicts the client draws from."""
+        # Names and colors for every cell in two gathers
+        terrain_names = TERRAIN_NAME_LUT[self.terrain].tolist()
+        colors = self.palette_lut[self.terrain, self.color_index].tolist()
+        
+        rows = []
+        for elevation_row, climate_row, terrain_row, color_row in zip(
+            self.elevation.tolist(), self.climate.tolist(), terrain_names, colors
+        ):
+            rows.append([
+                {
+                    "elevation": elevation,
+                    "climate": climate,
+                    "terrain_type": terrain_type,
+                    "color": color
+                }
+                for elevation, climate, terrain_type, color in zip(elevation_row, climate_row, terrain_row, color_row)
+            ])
+        return rows
+    
+    def terrain_at(self, x, y):
+        """Terrain name of the cell at column x, row y (None when off the map)."""
+        height, width = self.terrain.shape
+        if not (0 <= x < width and 0 <= y < height):
+            return None
+        return str(TERRAIN_NAME_LUT[self.terrain[y, x]])
 
 class MapGenerator:
-    def __init__(self, width, height, scale=20.0):
-        """Initialize map generator with dimensions and noise scale."""
+    def __init__(self, width, height, scale=20.0, seed=None):
+        """Initialize map generator with dimensions, noise scale and optional seed."""
         self.width = width
         self.height = height
         self.scale = scale
+        # Private generator so the same seed always reproduces the same map;
+        # negative seeds fold to their absolute value, as random.Random did
+        self.rng = np.random.default_rng(None if seed is None else abs(seed))
         # One noise generator for elevation, another for climate
-        self.elevation_noise = SimplexNoise()
-        self.climate_noise = SimplexNoise()
+        self.elevation_noise = SimplexNoise(int(self.rng.integers(2**32)))
+        self.climate_noise = SimplexNoise(int(self.rng.integers(2**32)))
         # Initialize color palette for different terrain types
         self.initialize_color_palette()
+        self.palettes = tuple(getattr(self, terrain_type) for terrain_type in TERRAIN_TYPES)
+        self.palette_lengths = np.array([len(palette) for palette in self.palettes])
+        # Every palette padded to the longest one, so colors gather as [terrain, index]
+        longest = self.palette_lengths.max()
+        self.palette_lut = np.array([palette + [palette[-1]] * (longest - len(palette)) for palette in self.palettes])
         
         # River generation parameters
         self.min_river_length = 14
@@ -140,61 +203,98 @@ class MapGenerator:
             
         return value / max_value
 
-    def get_biome_and_color(self, elevation, climate, x, y):
-        """Determine biome and color based on elevation and climate values."""
-        # Get base biome type
+    def smooth_noise_array(self, x, y, noise_gen, octaves=3):
+        """Vectorized smooth_noise over whole coordinate arrays."""
+        value = 0
+        amplitude = 1.0
+        frequency = 1.0
+        max_value = 0
+        
+        for _ in range(octaves):
+            value = value + noise_gen.normalized_noise_array(x * frequency, y * frequency) * amplitude
+            max_value += amplitude
+            amplitude *= 0.5
+            frequency *= 2
+            
+        return value / max_value
+
+    def classify_biomes(self, elevation, climate):
+        """Vectorized get_biome_type: biome codes for whole elevation and climate arrays."""
+        # Land biome by quantized climate zone, as in get_biome_type
+        climate_zones = np.clip(np.floor(climate * 5), 0, 4).astype(np.intp)
+        land_biomes = CLIMATE_ZONE_BIOMES[climate_zones]
+        
+        # Elevation bands win over climate, checked in the same order as get_biome_type
+        return np.select(
+            [elevation < 0.2, elevation < 0.3, elevation < 0.35,
+             elevation >= 0.85, elevation >= 0.75, elevation >= 0.65],
+            [TERRAIN_CODES['deep_ocean'], TERRAIN_CODES['shallow_water'], TERRAIN_CODES['beach'],
+             TERRAIN_CODES['snow_peaks'], TERRAIN_CODES['mountains'], TERRAIN_CODES['hills']],
+            default=land_biomes
+        ).astype(np.uint8)
+
+    def get_biome_and_color_index(self, elevation, climate, x, y, local_var=None):
+        """Determine biome and palette index based on elevation and climate values."""
         biome_type = self.get_biome_type(elevation, climate)
+        return biome_type, self.get_color_index(biome_type, elevation, x, y, local_var)
+
+    def get_color_indices(self, terrain, elevation, local_variation):
+        """Vectorized get_color_index over whole terrain, elevation and variation arrays."""
+        palette_lengths = self.palette_lengths[terrain]
+        
+        # Water colors follow elevation, land colors the local variation field
+        is_water = (terrain == TERRAIN_CODES['deep_ocean']) | (terrain == TERRAIN_CODES['shallow_water'])
+        variation = np.where(is_water, elevation, local_variation)
         
+        return np.minimum((variation * palette_lengths).astype(np.int64), palette_lengths - 1).astype(np.uint8)
+
+    def get_color_index(self, biome_type, elevation, x, y, local_var=None):
+        """Determine a cell's index into its biome's color palette."""
         # Select color palette based on biome type
         color_palette = getattr(self, biome_type)
         
         # Calculate color index based on local variation
-        if biome_type in ["deep_ocean", "shallow_water"]:
+        if biome_type in WATER_BIOMES:
             # Water areas use elevation for color variation
             color_index = min(int(elevation * len(color_palette)), len(color_palette) - 1)
         else:
             # Land areas use a combination of elevation and position for variation
-            local_var = self.smooth_noise(x/5, y/5, self.elevation_noise, octaves=2)
+            if local_var is None:
+                local_var = self.smooth_noise(x/5, y/5, self.elevation_noise, octaves=2)
             color_index = min(int(local_var * len(color_palette)), len(color_palette) - 1)
         
-        return biome_type, color_palette[color_index]
+        return color_index
 
     def get_neighbors(self, x, y):
         """Get valid neighboring cells including diagonals."""
         # Check orthogonal neighbors first, then diagonals
-        neighbors = []
-        # Orthogonal neighbors (NSEW)
-        for dx, dy in [(0,-1), (0,1), (-1,0), (1,0)]:
-            new_x, new_y = x + dx, y + dy
-            if 0 <= new_x < self.width and 0 <= new_y < self.height:
-                neighbors.append((new_x, new_y))
-        # Diagonal neighbors
-        for dx, dy in [(-1,-1), (-1,1), (1,-1), (1,1)]:
-            new_x, new_y = x + dx, y + dy
-            if 0 <= new_x < self.width and 0 <= new_y < self.height:
-                neighbors.append((new_x, new_y))
-        return neighbors
+        width, height = self.width, self.height
+        return [
+            (x + dx, y + dy) for dx, dy in NEIGHBOR_OFFSETS
+            if 0 <= x + dx < width and 0 <= y + dy < height
+        ]
 
     def find_flow_direction(self, x, y, elevation_map, visited):
         """Find the best direction for water to flow, handling flat areas."""
-        current_elevation = elevation_map[y][x]
-        neighbors = self.get_neighbors(x, y)
+        current_elevation = elevation_map[y, x]
+        width, height = self.width, self.height
         
         # First, try to find any lower neighbors
         best_drop = 0
         best_pos = None
         flat_neighbors = []
         
-        for nx, ny in neighbors:
-            if (nx, ny) in visited:
+        for dx, dy in NEIGHBOR_OFFSETS:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height) or visited[ny, nx]:
                 continue
                 
-            neighbor_elevation = elevation_map[ny][nx]
+            neighbor_elevation = elevation_map[ny, nx]
             elevation_drop = current_elevation - neighbor_elevation
             
             # If it's a lower neighbor
             if elevation_drop > 0:
-                if elevation_drop > best_drop or (elevation_drop == best_drop and abs(nx - x) + abs(ny - y) == 1):
+                if elevation_drop > best_drop or (elevation_drop == best_drop and abs(dx) + abs(dy) == 1):
                     best_drop = elevation_drop
                     best_pos = (nx, ny)
             # If it's a flat neighbor
@@ -207,33 +307,38 @@ class MapGenerator:
             
         # If we're in a flat area, try to find a path to lower ground
         if flat_neighbors:
-            # Use BFS to find the nearest lower ground
-            queue = deque([(x, y, [])])
-            flat_visited = {(x, y)}
+            # Use BFS to find the nearest lower ground, recording each flat cell's parent
+            queue = deque([(x, y)])
+            parent = {(x, y): None}
             
             while queue:
-                cx, cy, path = queue.popleft()
-                for nx, ny in self.get_neighbors(cx, cy):
-                    if (nx, ny) in flat_visited:
+                cx, cy = queue.popleft()
+                for dx, dy in NEIGHBOR_OFFSETS:
+                    nx, ny = cx + dx, cy + dy
+                    if not (0 <= nx < width and 0 <= ny < height) or (nx, ny) in parent:
                         continue
                         
-                    # If we found lower ground, return the first step in its direction
-                    if elevation_map[ny][nx] < current_elevation:
-                        return path[0] if path else (nx, ny)
+                    # If we found lower ground, walk back to the first step in its direction
+                    if elevation_map[ny, nx] < current_elevation:
+                        node = (nx, ny)
+                        if (cx, cy) != (x, y):
+                            node = (cx, cy)
+                            while parent[node] != (x, y):
+                                node = parent[node]
+                        return node
                         
                     # If it's flat, add it to the queue
-                    if elevation_map[ny][nx] == current_elevation:
-                        new_path = path + [(nx, ny)] if path else [(nx, ny)]
-                        queue.append((nx, ny, new_path))
-                        flat_visited.add((nx, ny))
+                    if elevation_map[ny, nx] == current_elevation:
+                        queue.append((nx, ny))
+                        parent[(nx, ny)] = (cx, cy)
             
             # If no path to lower ground found, pick the best flat neighbor
             if flat_neighbors:
                 # Prefer orthogonal neighbors over diagonal ones
                 orthogonal_neighbors = [(nx, ny) for nx, ny in flat_neighbors if abs(nx - x) + abs(ny - y) == 1]
                 if orthogonal_neighbors:
-                    return random.choice(orthogonal_neighbors)
-                return random.choice(flat_neighbors)
+                    return orthogonal_neighbors[self.rng.integers(len(orthogonal_neighbors))]
+                return flat_neighbors[self.rng.integers(len(flat_neighbors))]
         
         return None
 
@@ -241,8 +346,9 @@ class MapGenerator:
         """Trace a river path from source to water body or map edge."""
         path = [(start_x, start_y)]
         current_x, current_y = start_x, start_y
-        visited = {(start_x, start_y)}
-        last_elevation = elevation_map[start_y][start_x]
+        visited = np.zeros((self.height, self.width), dtype=np.bool_)
+        visited[start_y, start_x] = True
+        last_elevation = elevation_map[start_y, start_x]
         
         while True:
             # Find the next position using the improved flow direction logic
@@ -253,7 +359,7 @@ class MapGenerator:
                 break
                 
             next_x, next_y = next_pos
-            next_elevation = elevation_map[next_y][next_x]
+            next_elevation = elevation_map[next_y, next_x]
             
             # Handle diagonal movements by adding intermediate points
             dx = next_x - current_x
@@ -266,30 +372,30 @@ class MapGenerator:
                 option2 = (current_x, current_y + dy)
                 
                 # Check which intermediate point has a better elevation gradient
-                elev1 = elevation_map[current_y][current_x + dx] if option1[0] >= 0 and option1[0] < self.width else float('inf')
-                elev2 = elevation_map[current_y + dy][current_x] if option2[1] >= 0 and option2[1] < self.height else float('inf')
+                elev1 = elevation_map[current_y, current_x + dx] if option1[0] >= 0 and option1[0] < self.width else float('inf')
+                elev2 = elevation_map[current_y + dy, current_x] if option2[1] >= 0 and option2[1] < self.height else float('inf')
                 
                 # Choose the intermediate point with the smoother elevation transition
                 if abs(elev1 - last_elevation) < abs(elev2 - last_elevation):
-                    if option1 not in visited:
+                    if not visited[option1[1], option1[0]]:
                         path.append(option1)
-                        visited.add(option1)
-                elif option2 not in visited:
+                        visited[option1[1], option1[0]] = True
+                elif not visited[option2[1], option2[0]]:
                     path.append(option2)
-                    visited.add(option2)
+                    visited[option2[1], option2[0]] = True
             # For longer jumps (which shouldn't happen often but just in case)
             elif abs(dx) > 1 or abs(dy) > 1:
                 steps = max(abs(dx), abs(dy))
                 for i in range(1, steps):
                     ix = current_x + int(dx * i / steps)
                     iy = current_y + int(dy * i / steps)
-                    if (ix, iy) not in visited:
+                    if not visited[iy, ix]:
                         path.append((ix, iy))
-                        visited.add((ix, iy))
+                        visited[iy, ix] = True
             
             # Add the next position to the path
             path.append(next_pos)
-            visited.add(next_pos)
+            visited[next_y, next_x] = True
             
             # Stop if we've reached water level
             if next_elevation < self.water_level:
@@ -299,53 +405,54 @@ class MapGenerator:
             current_x, current_y = next_x, next_y
             last_elevation = next_elevation
             
-        return path if len(path) >= self.min_river_length else []
+        # Packed once as an (n, 2) array of x, y rows; empty when the river is too short
+        if len(path) < self.min_river_length:
+            return np.empty((0, 2), dtype=np.int32)
+        return np.array(path, dtype=np.int32)
 
     def find_river_sources(self, elevation_map):
-        """Find suitable river source points (high elevation areas)."""
-        sources = []
-        for y in range(self.height):
-            for x in range(self.width):
-                if elevation_map[y][x] > self.river_source_elevation_threshold:
-                    # Add some randomness to source selection
-                    if random.random() < 0.1:  # 10% chance for eligible cells
-                        sources.append((x, y))
-        return sources
+        """Find suitable river source points (high elevation areas), highest first."""
+        eligible = elevation_map > self.river_source_elevation_threshold
+        
+        # Add some randomness to source selection: 10% chance for eligible cells
+        candidates = np.argwhere(eligible & (self.rng.random(elevation_map.shape) < 0.1))
+        
+        # Sort sources by elevation (highest first); stable, so ties keep row-major order
+        order = np.argsort(-elevation_map[candidates[:, 0], candidates[:, 1]], kind='stable')
+        return [(x, y) for y, x in candidates[order].tolist()]
 
     def generate_rivers(self, elevation_map):
         """Generate rivers starting from high elevation points."""
         river_paths = []
-        river_cells = set()  # Keep track of cells that are part of rivers
+        river_cells = np.zeros((self.height, self.width), dtype=np.bool_)  # Cells that are part of rivers
         
-        # Find potential river sources
+        # Find potential river sources, highest first
         sources = self.find_river_sources(elevation_map)
         
-        # Sort sources by elevation (highest first)
-        sources.sort(key=lambda pos: elevation_map[pos[1]][pos[0]], reverse=True)
-        
         # Generate rivers from each source
         for source_x, source_y in sources:
             # Skip if this cell is already part of a river
-            if (source_x, source_y) in river_cells:
+            if river_cells[source_y, source_x]:
                 continue
                 
             # Trace the river path
             path = self.trace_river_path(source_x, source_y, elevation_map)
             
             # If path is long enough and doesn't overlap too much with existing rivers
-            if path:
-                overlap = sum(1 for pos in path if pos in river_cells)
+            if len(path):
+                path_x, path_y = path[:, 0], path[:, 1]
+                overlap = int(river_cells[path_y, path_x].sum())
                 if overlap < len(path) * 0.3:  # Allow 30% overlap
                     river_paths.append(path)
-                    river_cells.update(path)
+                    river_cells[path_y, path_x] = True
         
         return river_paths
 
     def apply_rivers_to_map(self, map_data, river_paths):
         """Apply rivers to the map data with improved connectivity."""
         # Create a river width map (some rivers are wider)
-        river_widths = {}
-        river_cells = set()
+        river_widths = np.zeros((self.height, self.width))
+        river_cells = np.zeros((self.height, self.width), dtype=np.bool_)
         
         # First pass: Mark all river cells and calculate initial widths
         for path in river_paths:
@@ -353,105 +460,64 @@ class MapGenerator:
             base_width = min(len(path) / 20, 3)  # Max width of 3
             
             # Apply graduated widths - rivers get wider as they flow downstream
-            for i, pos in enumerate(path):
-                # Rivers get slightly wider as they progress (downstream)
-                progress = i / len(path)  # 0 at source, 1 at mouth
-                width = base_width * (0.5 + 0.5 * progress)  # Width increases gradually
-                river_widths[pos] = max(river_widths.get(pos, 0), width)
-                river_cells.add(pos)
+            progress = np.arange(len(path)) / len(path)  # 0 at source, 1 at mouth
+            widths = base_width * (0.5 + 0.5 * progress)  # Width increases gradually
+            np.maximum.at(river_widths, (path[:, 1], path[:, 0]), widths)
+            river_cells[path[:, 1], path[:, 0]] = True
         
         # Second pass: Ensure connectivity and smooth transitions
-        gaps_filled = True
-        while gaps_filled:
-            gaps_filled = False
-            new_river_cells = set()
+        elevation = map_data.elevation
+        height, width = self.height, self.width
+        while True:
+            new_river_cells = np.zeros_like(river_cells)
             
-            for x, y in river_cells:
-                # Check all 8 neighboring cells
-                for dx, dy in [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]:
-                    nx, ny = x + dx, y + dy
-                    
-                    # Skip if out of bounds
-                    if not (0 <= nx < self.width and 0 <= ny < self.height):
-                        continue
-                    
-                    # If this is a diagonal neighbor
-                    if abs(dx) == 1 and abs(dy) == 1:
-                        # Check if there's a river cell diagonally adjacent
-                        if (nx, ny) in river_cells:
-                            # Add intermediate cells to ensure connectivity
-                            if (x + dx, y) not in river_cells and (x, y + dy) not in river_cells:
-                                # Choose the better intermediate point based on elevation
-                                if map_data[y][x + dx]['elevation'] < map_data[y + dy][x]['elevation']:
-                                    new_river_cells.add((x + dx, y))
-                                else:
-                                    new_river_cells.add((x, y + dy))
-                                gaps_filled = True
+            # Diagonal-only links get the orthogonal cell on lower ground (both on a tie).
+            # Down-right pairs (x, y)-(x+1, y+1) pass through (x+1, y) or (x, y+1)
+            gap = river_cells[:-1, :-1] & river_cells[1:, 1:] & ~river_cells[:-1, 1:] & ~river_cells[1:, :-1]
+            new_river_cells[:-1, 1:] |= gap & (elevation[:-1, 1:] <= elevation[1:, :-1])
+            new_river_cells[1:, :-1] |= gap & (elevation[1:, :-1] <= elevation[:-1, 1:])
+            
+            # Down-left pairs (x, y)-(x-1, y+1) pass through (x-1, y) or (x, y+1)
+            gap = river_cells[:-1, 1:] & river_cells[1:, :-1] & ~river_cells[:-1, :-1] & ~river_cells[1:, 1:]
+            new_river_cells[:-1, :-1] |= gap & (elevation[:-1, :-1] <= elevation[1:, 1:])
+            new_river_cells[1:, 1:] |= gap & (elevation[1:, 1:] <= elevation[:-1, :-1])
+            
+            if not new_river_cells.any():
+                break
             
-            # Add new river cells and calculate their widths
-            for pos in new_river_cells:
-                if pos not in river_cells:
-                    # Calculate width based on neighboring river cells
-                    x, y = pos
-                    neighbor_widths = [river_widths[nx, ny] 
-                                     for nx, ny in self.get_neighbors(x, y)
-                                     if (nx, ny) in river_widths]
-                    if neighbor_widths:
-                        river_widths[pos] = sum(neighbor_widths) / len(neighbor_widths)
-                    river_cells.add(pos)
+            # New cells take the mean width of their neighboring river cells
+            padded_widths = np.pad(np.where(river_cells, river_widths, 0.0), 1)
+            padded_cells = np.pad(river_cells, 1).astype(np.int64)
+            width_sum = sum(padded_widths[1 + dy:1 + dy + height, 1 + dx:1 + dx + width] for dx, dy in NEIGHBOR_OFFSETS)
+            neighbor_count = sum(padded_cells[1 + dy:1 + dy + height, 1 + dx:1 + dx + width] for dx, dy in NEIGHBOR_OFFSETS)
+            river_widths[new_river_cells] = width_sum[new_river_cells] / neighbor_count[new_river_cells]
+            river_cells |= new_river_cells
 
         # Apply rivers to the map
-        for pos in river_cells:
-            x, y = pos
-            # Ensure width_index is valid
-            width = river_widths[pos]
-            width_index = min(int(width), len(self.river) - 1)
-            map_data[y][x]['color'] = self.river[width_index]
-            map_data[y][x]['terrain_type'] = 'river'
+        # Ensure width_index is valid
+        width_index = np.minimum(river_widths.astype(np.int64), len(self.river) - 1)
+        map_data.color_index[river_cells] = width_index[river_cells]
+        map_data.terrain[river_cells] = TERRAIN_CODES['river']
 
     def generate_map(self):
         """Generate topographical map data with distinct biome regions and rivers."""
-        # First pass: Generate base elevation and climate maps
-        elevation_map = []
-        climate_map = []
-        
-        for y in range(self.height):
-            elevation_row = []
-            climate_row = []
-            for x in range(self.width):
-                nx = x / self.scale
-                ny = y / self.scale
-                
-                elevation = self.smooth_noise(nx, ny, self.elevation_noise, octaves=4)
-                climate = self.smooth_noise(nx * 0.5, ny * 0.5, self.climate_noise, octaves=2)
-                
-                elevation_row.append(elevation)
-                climate_row.append(climate)
-            
-            elevation_map.append(elevation_row)
-            climate_map.append(climate_row)
+        # First pass: Generate base elevation and climate maps for every cell at once
+        nx, ny = np.meshgrid(np.arange(self.width) / self.scale, np.arange(self.height) / self.scale)
+        elevation_map = self.smooth_noise_array(nx, ny, self.elevation_noise, octaves=4)
+        climate_map = self.smooth_noise_array(nx * 0.5, ny * 0.5, self.climate_noise, octaves=2)
+        
+        # Per-cell color variation for land, sampled on a finer grid
+        lx, ly = np.meshgrid(np.arange(self.width) / 5, np.arange(self.height) / 5)
+        local_variation = self.smooth_noise_array(lx, ly, self.elevation_noise, octaves=2)
 
         # Generate rivers
         river_paths = self.generate_rivers(elevation_map)
         
-        # Second pass: Generate final map with biome information
-        map_data = []
-        for y in range(self.height):
-            row = []
-            for x in range(self.width):
-                elevation = elevation_map[y][x]
-                climate = climate_map[y][x]
-                
-                terrain_type, color = self.get_biome_and_color(elevation, climate, x, y)
-                
-                cell = {
-                    "elevation": elevation,
-                    "climate": climate,
-                    "terrain_type": terrain_type,
-                    "color": color
-                }
-                row.append(cell)
-            map_data.append(row)
+        # Second pass: Classify every cell into its biome and palette entry
+        terrain = self.classify_biomes(elevation_map, climate_map)
+        color_index = self.get_color_indices(terrain, elevation_map, local_variation)
+        
+        map_data = MapData(elevation_map, climate_map, terrain, color_index, self.palette_lut)
 
         # Apply rivers to the map
         self.apply_rivers_to_map(map_data, river_paths)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the cache version column to the Player table.
+"""
+
+from app import app, db
+from sqlalchemy import text
+
+def migrate_cache_version():
+    """Add cache_version column to existing Player table."""
+    with app.app_context():
+        try:
+            # Check if column exists
+            result = db.session.execute(text("PRAGMA table_info(player)"))
+            columns = [row[1] for row in result]
+            
+            if 'cache_version' not in columns:
+                db.session.execute(text("ALTER TABLE player ADD COLUMN cache_version INTEGER DEFAULT 0"))
+                print("Added cache_version column")
+            
+            db.session.commit()
+            print("Migration completed successfully!")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    migrate_cache_version()
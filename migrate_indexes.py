@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Migration script to create indexes declared on the models for existing tables.
+"""
+
+from app import app, db
+from models import Player
+from sqlalchemy import func, select, inspect
+
+def find_case_duplicate_names():
+    """Group player names that only differ in case, which block ix_player_name_lower."""
+    lowered = func.lower(Player.name)
+    return db.session.execute(
+        select(lowered, func.group_concat(Player.name, ', '))
+        .group_by(lowered)
+        .having(func.count() > 1)
+    ).all()
+
+def migrate_indexes():
+    """Create any model-declared index that is missing from the database."""
+    with app.app_context():
+        existing_tables = set(inspect(db.engine).get_table_names())
+        failed = []
+        
+        # db.create_all() only creates indexes alongside new tables
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                print(f"Skipping indexes on {table.name}: table does not exist")
+                continue
+            
+            for index in table.indexes:
+                # A unique index cannot be built over rows that already collide
+                if index.name == 'ix_player_name_lower':
+                    duplicates = find_case_duplicate_names()
+                    if duplicates:
+                        print(f"Cannot create {index.name}: these player names differ only in case:")
+                        for _, names in duplicates:
+                            print(f"  {names}")
+                        print("Rename all but one player in each group, then run this migration again.")
+                        failed.append(index.name)
+                        continue
+                
+                # Each index is created on its own, so one failure does not block the rest
+                try:
+                    index.create(bind=db.engine, checkfirst=True)
+                    print(f"Ensured index {index.name}")
+                except Exception as e:
+                    print(f"Failed to create index {index.name}: {e}")
+                    failed.append(index.name)
+        
+        if failed:
+            print(f"Migration finished with errors; missing indexes: {', '.join(failed)}")
+        else:
+            print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate_indexes()
@@ -4,7 +4,6 @@ Migration script to add movement system columns to the Player table.
 """
 
 from app import app, db
-from models import Player
 from sqlalchemy import text
 
 def migrate_movement_system():
@@ -38,25 +37,38 @@ def migrate_movement_system():
             
             db.session.commit()
             
-            # Initialize movement system for existing players
-            players = Player.query.all()
-            for player in players:
-                if player.movement_points_remaining is None:
-                    player.movement_points_remaining = 0.0
-                if player.turn_number is None:
-                    player.turn_number = 1
-                if player.map_x_frac is None:
-                    player.map_x_frac = 0.0
-                if player.map_y_frac is None:
-                    player.map_y_frac = 0.0
-                
-                # Set first operational mech as active if none set
-                if not player.active_mech_id and player.mechs:
-                    for mech in player.mechs:
-                        if mech.is_operational():
-                            player.active_mech_id = mech.id
-                            player.movement_points_remaining = player.get_movement_points()
-                            break
+            # Initialize movement system for existing players in one statement
+            db.session.execute(text("""
+                UPDATE player SET
+                    movement_points_remaining = COALESCE(movement_points_remaining, 0.0),
+                    turn_number = COALESCE(turn_number, 1),
+                    map_x_frac = COALESCE(map_x_frac, 0.0),
+                    map_y_frac = COALESCE(map_y_frac, 0.0)
+                WHERE movement_points_remaining IS NULL OR turn_number IS NULL
+                    OR map_x_frac IS NULL OR map_y_frac IS NULL
+            """))
+            
+            # Set first operational mech as active if none set, with its walking MP;
+            # SQLite evaluates both SET expressions against the old row
+            db.session.execute(text("""
+                UPDATE player SET
+                    active_mech_id = (
+                        SELECT pm.id FROM player_mech pm
+                        WHERE pm.player_id = player.id AND pm.internal_condition > 0.0
+                        ORDER BY pm.id LIMIT 1
+                    ),
+                    movement_points_remaining = COALESCE((
+                        SELECT json_extract(mt.specs, '$.movement_points.walking')
+                        FROM player_mech pm JOIN mech_template mt ON mt.id = pm.template_id
+                        WHERE pm.player_id = player.id AND pm.internal_condition > 0.0
+                        ORDER BY pm.id LIMIT 1
+                    ), 0)
+                WHERE (active_mech_id IS NULL OR active_mech_id = 0)
+                    AND EXISTS (
+                        SELECT 1 FROM player_mech pm
+                        WHERE pm.player_id = player.id AND pm.internal_condition > 0.0
+                    )
+            """))
             
             db.session.commit()
             print("Migration completed successfully!")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the maintained operational mech count to the Player table.
+"""
+
+from app import app, db
+from models import Player, PlayerMech
+from sqlalchemy import func, select, text, update
+
+def migrate_operational_mech_count():
+    """Add operational_mech_count column and backfill it from each player's mechs."""
+    with app.app_context():
+        try:
+            # Check if column exists
+            result = db.session.execute(text("PRAGMA table_info(player)"))
+            columns = [row[1] for row in result]
+            
+            if 'operational_mech_count' not in columns:
+                db.session.execute(text("ALTER TABLE player ADD COLUMN operational_mech_count INTEGER DEFAULT 0"))
+                print("Added operational_mech_count column")
+            
+            db.session.commit()
+            
+            # Count operational mechs for existing players in one statement; this
+            # goes through the table rather than the ORM, which would also select
+            # columns added by later migrations such as cache_version
+            player = Player.__table__
+            db.session.execute(
+                update(player).values(
+                    operational_mech_count=select(func.count(PlayerMech.id))
+                    .where(PlayerMech.player_id == player.c.id, PlayerMech.operational_expression())
+                    .scalar_subquery()
+                )
+            )
+            
+            db.session.commit()
+            print("Migration completed successfully!")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"Migration failed: {e}")
+
+if __name__ == "__main__":
+    migrate_operational_mech_count()
@@ -1,8 +1,45 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from datetime import datetime
-import json
+import math
+import orjson
 
-db = SQLAlchemy()
+class RoutingSession(Session):
+    """Session that sends every query to the read-only engine once marked readonly."""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        """Pick the read-only engine for readonly sessions, else the usual bind."""
+        if bind is None and self.info.get('readonly'):
+            return self._db.engines['readonly']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+# Keep loaded state after commit so responses built from committed objects
+# (to_dict() and friends) don't re-SELECT every expired attribute
+db = SQLAlchemy(session_options={'expire_on_commit': False, 'class_': RoutingSession})
+
+def parse_json_column(instance, column, empty):
+    """Parse a JSON text column, reusing the last parse until the stored text changes."""
+    raw = getattr(instance, column)
+    if not raw:
+        return empty()
+    
+    # Keyed on the raw string itself, so direct assignments and reloads invalidate it;
+    # the parsed value is shared between calls, so callers must not mutate it
+    cache = instance.__dict__.setdefault('_json_cache', {})
+    cached = cache.get(column)
+    if cached is None or cached[0] is not raw:
+        cached = cache[column] = (raw, orjson.loads(raw))
+    return cached[1]
+
+def cached_template_dict(template, build):
+    """Return a template's to_dict(), rebuilding it only when its id or specs text changes."""
+    # Template catalog columns are never edited in place, so the id and the raw
+    # specs string identify the row's state; the dict is shared, so don't mutate it
+    key = (template.id, template.specs)
+    cached = template.__dict__.get('_dict_cache')
+    if cached is None or cached[0][0] != key[0] or cached[0][1] is not key[1]:
+        cached = template.__dict__['_dict_cache'] = (key, build())
+    return cached[1]
 
 class Player(db.Model):
     """Player character model with MechWarrior stats."""
@@ -39,6 +76,12 @@ class Player(db.Model):
     # Mission tracking
     declined_missions = db.Column(db.Text, default='[]')  # JSON array of declined mission IDs
     
+    # Bumped on every write so per-player reads can be revalidated by ETag
+    cache_version = db.Column(db.Integer, default=0)
+    
+    # Kept in step by PlayerMech.take_damage()/repair() and when mechs are added
+    operational_mech_count = db.Column(db.Integer, default=0)
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_active = db.Column(db.DateTime, default=datetime.utcnow)
@@ -48,17 +91,23 @@ class Player(db.Model):
     vehicles = db.relationship('PlayerVehicle', backref='owner', lazy=True)
     active_mech = db.relationship('PlayerMech', foreign_keys=[active_mech_id], post_update=True)
     
+    # Names are matched case-insensitively on create/load; players are looked up by tile
+    __table_args__ = (
+        db.Index('ix_player_name_lower', db.func.lower(name), unique=True),
+        db.Index('ix_player_map_xy', map_x, map_y),
+    )
+    
     def get_skills(self):
         """Get skills as dictionary."""
-        return json.loads(self.skills) if self.skills else {}
+        return parse_json_column(self, 'skills', dict)
     
     def set_skills(self, skills_dict):
         """Set skills from dictionary."""
-        self.skills = json.dumps(skills_dict)
+        self.skills = orjson.dumps(skills_dict).decode('utf-8')
     
     def add_skill(self, skill_name, level=1):
         """Add or update a skill."""
-        skills = self.get_skills()
+        skills = dict(self.get_skills())
         skills[skill_name] = level
         self.set_skills(skills)
     
@@ -69,19 +118,27 @@ class Player(db.Model):
     
     def get_declined_missions(self):
         """Get list of declined mission IDs."""
-        return json.loads(self.declined_missions) if self.declined_missions else []
+        return parse_json_column(self, 'declined_missions', list)
     
     def add_declined_mission(self, mission_id):
         """Add a mission ID to the declined list."""
-        declined = self.get_declined_missions()
+        declined = list(self.get_declined_missions())
         if mission_id not in declined:
             declined.append(mission_id)
-            self.declined_missions = json.dumps(declined)
+            self.declined_missions = orjson.dumps(declined).decode('utf-8')
     
     def clear_declined_missions(self):
         """Clear all declined missions (when moving or ending turn)."""
         self.declined_missions = '[]'
     
+    def bump_cache_version(self):
+        """Invalidate clients' cached hangar and mission reads."""
+        self.cache_version = (self.cache_version or 0) + 1
+    
+    def adjust_operational_mech_count(self, delta):
+        """Adjust the maintained count of operational mechs."""
+        self.operational_mech_count = (self.operational_mech_count or 0) + delta
+    
     def can_afford(self, cost):
         """Check if player can afford something."""
         return self.credits >= cost
@@ -116,15 +173,21 @@ class Player(db.Model):
     
     def set_exact_position(self, x, y):
         """Set exact position, splitting into integer and fractional parts."""
-        self.map_x = int(x)
-        self.map_y = int(y)
-        self.map_x_frac = x - self.map_x
-        self.map_y_frac = y - self.map_y
+        # modf truncates toward zero like int(), without reading the attributes back
+        x_frac, x_whole = math.modf(x)
+        y_frac, y_whole = math.modf(y)
+        self.map_x = int(x_whole)
+        self.map_y = int(y_whole)
+        self.map_x_frac = x_frac
+        self.map_y_frac = y_frac
     
     def get_active_mech(self):
         """Get the currently active mech."""
-        if self.active_mech_id:
-            return PlayerMech.query.get(self.active_mech_id)
+        # Go through the relationship so a just-assigned, unflushed mech is seen too;
+        # it resolves from the identity map, and a null id needs no lookup at all
+        active_mech = self.active_mech
+        if active_mech is not None:
+            return active_mech
         elif self.mechs:
             # Default to first operational mech
             for mech in self.mechs:
@@ -138,52 +201,60 @@ class Player(db.Model):
         if not active_mech:
             return 0
         
-        specs = active_mech.template.get_specs()
-        movement = specs.get('movement_points', {})
-        
         # Use walking speed as base movement points
-        return movement.get('walking', 0)
+        return active_mech.template.get_movement_points()['walking']
     
     def start_turn(self):
         """Start a new turn and refresh movement points."""
         self.movement_points_remaining = self.get_movement_points()
         self.turn_number += 1
     
-    def can_move_to(self, target_x, target_y, terrain_cost=1):
-        """Check if player can move to target position."""
-        current_pos = self.get_exact_position()
+    def _exact_xy(self):
+        """Exact position as an (x, y) tuple, without building the API dict."""
+        return self.map_x + self.map_x_frac, self.map_y + self.map_y_frac
+    
+    def _move_cost(self, target_x, target_y, terrain_cost):
+        """Movement cost from the exact position to the target."""
+        current_x, current_y = self._exact_xy()
         
         # Calculate distance in half-hexes
-        distance = abs(target_x - current_pos['x']) + abs(target_y - current_pos['y'])
+        distance = abs(target_x - current_x) + abs(target_y - current_y)
         
         # Movement cost is distance * terrain cost
-        move_cost = distance * terrain_cost
-        
-        return move_cost <= self.movement_points_remaining
+        return distance * terrain_cost
+    
+    def can_move_to(self, target_x, target_y, terrain_cost=1):
+        """Check if player can move to target position."""
+        return self._move_cost(target_x, target_y, terrain_cost) <= self.movement_points_remaining
     
     def move_to(self, target_x, target_y, terrain_cost=1):
         """Move to target position if possible."""
-        if not self.can_move_to(target_x, target_y, terrain_cost):
+        # Cost is computed once and used for both the check and the deduction
+        move_cost = self._move_cost(target_x, target_y, terrain_cost)
+        if move_cost > self.movement_points_remaining:
             return False
         
-        current_pos = self.get_exact_position()
-        
-        # Calculate distance and cost
-        distance = abs(target_x - current_pos['x']) + abs(target_y - current_pos['y'])
-        move_cost = distance * terrain_cost
-        
         # Update position and movement points
         self.set_exact_position(target_x, target_y)
         self.movement_points_remaining -= move_cost
         
         return True
     
-    def to_dict(self):
-        """Convert player to dictionary for JSON serialization."""
+    def units_to_dict(self):
+        """Convert the player's active mech, mechs and vehicles for JSON serialization."""
         active_mech = self.get_active_mech()
-        exact_pos = self.get_exact_position()
         
         return {
+            'active_mech': active_mech.to_dict() if active_mech else None,
+            'mechs': [mech.to_dict() for mech in self.mechs],
+            'vehicles': [vehicle.to_dict() for vehicle in self.vehicles]
+        }
+    
+    def to_dict(self, units=None):
+        """Convert player to dictionary for JSON serialization (units may be prebuilt)."""
+        exact_pos = self.get_exact_position()
+        
+        data = {
             'id': self.id,
             'name': self.name,
             'gunnery': self.gunnery,
@@ -199,11 +270,10 @@ class Player(db.Model):
             'movement_points_remaining': self.movement_points_remaining,
             'movement_points_total': self.get_movement_points(),
             'turn_number': self.turn_number,
-            'declined_missions': self.get_declined_missions(),
-            'active_mech': active_mech.to_dict() if active_mech else None,
-            'mechs': [mech.to_dict() for mech in self.mechs],
-            'vehicles': [vehicle.to_dict() for vehicle in self.vehicles]
+            'declined_missions': self.get_declined_missions()
         }
+        data.update(units if units is not None else self.units_to_dict())
+        return data
 
 class MechTemplate(db.Model):
     """Template for available mechs (loaded from mechs.json)."""
@@ -217,17 +287,48 @@ class MechTemplate(db.Model):
     # Technical specs (JSON for flexibility)
     specs = db.Column(db.Text, nullable=False)  # JSON string with all mech data
     
+    # Template ids by (name, model), filled as templates are found
+    _ids_by_key = {}
+    
+    @classmethod
+    def find(cls, name, model):
+        """Find a template by name and model, skipping the query once its id is known."""
+        template_id = cls._ids_by_key.get((name, model))
+        template = db.session.get(cls, template_id) if template_id else None
+        
+        # A stale id (e.g. from a rolled-back insert) may now point at another template
+        if template is None or template.name != name or template.model != model:
+            template = cls.query.filter_by(name=name, model=model).first()
+            if template:
+                cls._ids_by_key[(name, model)] = template.id
+        return template
+    
     def get_specs(self):
         """Get specs as dictionary."""
-        return json.loads(self.specs)
+        return parse_json_column(self, 'specs', dict)
     
     def set_specs(self, specs_dict):
         """Set specs from dictionary."""
-        self.specs = json.dumps(specs_dict)
+        self.specs = orjson.dumps(specs_dict).decode('utf-8')
+    
+    def get_movement_points(self):
+        """Get walking/running/jumping points, rebuilt only when the specs text changes."""
+        # Keyed on the raw specs string like parse_json_column, so set_specs invalidates it;
+        # the dict is shared between calls, so callers must not mutate it
+        raw = self.specs
+        cached = self.__dict__.get('_movement_points')
+        if cached is None or cached[0] is not raw:
+            movement = self.get_specs().get('movement_points', {})
+            cached = self.__dict__['_movement_points'] = (raw, {
+                'walking': movement.get('walking', 0),
+                'running': movement.get('running', 0),
+                'jumping': movement.get('jumping', 0)
+            })
+        return cached[1]
     
     def to_dict(self):
-        """Convert to dictionary."""
-        return {
+        """Convert to dictionary, reusing the last result while the row is unchanged."""
+        return cached_template_dict(self, lambda: {
             'id': self.id,
             'name': self.name,
             'model': self.model,
@@ -235,13 +336,13 @@ class MechTemplate(db.Model):
             'battle_value': self.battle_value,
             'price': self.price,
             'specs': self.get_specs()
-        }
+        })
 
 class PlayerMech(db.Model):
     """Player-owned mech instance."""
     id = db.Column(db.Integer, primary_key=True)
-    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
-    template_id = db.Column(db.Integer, db.ForeignKey('mech_template.id'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False, index=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('mech_template.id'), nullable=False, index=True)
     
     # Mech condition
     armor_condition = db.Column(db.Float, default=1.0)  # 0.0 to 1.0
@@ -254,7 +355,8 @@ class PlayerMech(db.Model):
     purchased_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
-    template = db.relationship('MechTemplate', backref='instances')
+    # A unit is never displayed without its template, so load it in the same query
+    template = db.relationship('MechTemplate', backref='instances', lazy='joined')
     
     def get_display_name(self):
         """Get display name (custom name or template name)."""
@@ -267,29 +369,50 @@ class PlayerMech(db.Model):
         base_cost = self.template.price * 0.1  # 10% of purchase price for full repair
         return int(base_cost * (armor_damage + internal_damage * 2))
     
+    @classmethod
+    def repair_cost_expression(cls):
+        """SQL equivalent of get_repair_cost() (query must join MechTemplate)."""
+        armor_damage = 1.0 - cls.armor_condition
+        internal_damage = 1.0 - cls.internal_condition
+        base_cost = MechTemplate.price * 0.1
+        return db.cast(base_cost * (armor_damage + internal_damage * 2), db.Integer)
+    
     def repair(self, amount=1.0):
         """Repair mech (amount from 0.0 to 1.0)."""
+        was_operational = self.is_operational()
         self.armor_condition = min(1.0, self.armor_condition + amount)
         self.internal_condition = min(1.0, self.internal_condition + amount)
+        if not was_operational and self.is_operational():
+            self.owner.adjust_operational_mech_count(1)
     
     def take_damage(self, armor_damage=0.0, internal_damage=0.0):
         """Take damage to mech."""
+        was_operational = self.is_operational()
         self.armor_condition = max(0.0, self.armor_condition - armor_damage)
         self.internal_condition = max(0.0, self.internal_condition - internal_damage)
+        if was_operational and not self.is_operational():
+            self.owner.adjust_operational_mech_count(-1)
+    
+    @classmethod
+    def take_damage_batch(cls, mechs, armor_damage, internal_damage=None):
+        """Apply pre-rolled per-mech damage arrays to a list of mechs."""
+        if internal_damage is None:
+            internal_damage = [0.0] * len(mechs)
+        for mech, armor, internal in zip(mechs, armor_damage, internal_damage):
+            mech.take_damage(armor_damage=armor, internal_damage=internal)
     
     def is_operational(self):
         """Check if mech is operational."""
         return self.internal_condition > 0.0
     
+    @classmethod
+    def operational_expression(cls):
+        """SQL equivalent of is_operational()."""
+        return cls.internal_condition > 0.0
+    
     def get_movement_points(self):
         """Get movement points for this mech."""
-        specs = self.template.get_specs()
-        movement = specs.get('movement_points', {})
-        return {
-            'walking': movement.get('walking', 0),
-            'running': movement.get('running', 0),
-            'jumping': movement.get('jumping', 0)
-        }
+        return self.template.get_movement_points()
     
     def to_dict(self):
         """Convert to dictionary."""
@@ -319,15 +442,15 @@ class VehicleTemplate(db.Model):
     
     def get_specs(self):
         """Get specs as dictionary."""
-        return json.loads(self.specs)
+        return parse_json_column(self, 'specs', dict)
     
     def set_specs(self, specs_dict):
         """Set specs from dictionary."""
-        self.specs = json.dumps(specs_dict)
+        self.specs = orjson.dumps(specs_dict).decode('utf-8')
     
     def to_dict(self):
-        """Convert to dictionary."""
-        return {
+        """Convert to dictionary, reusing the last result while the row is unchanged."""
+        return cached_template_dict(self, lambda: {
             'id': self.id,
             'name': self.name,
             'vehicle_type': self.vehicle_type,
@@ -335,13 +458,13 @@ class VehicleTemplate(db.Model):
             'battle_value': self.battle_value,
             'price': self.price,
             'specs': self.get_specs()
-        }
+        })
 
 class PlayerVehicle(db.Model):
     """Player-owned vehicle instance."""
     id = db.Column(db.Integer, primary_key=True)
-    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
-    template_id = db.Column(db.Integer, db.ForeignKey('vehicle_template.id'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False, index=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('vehicle_template.id'), nullable=False, index=True)
     
     # Vehicle condition
     condition = db.Column(db.Float, default=1.0)  # 0.0 to 1.0
@@ -353,7 +476,8 @@ class PlayerVehicle(db.Model):
     purchased_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
-    template = db.relationship('VehicleTemplate', backref='instances')
+    # A unit is never displayed without its template, so load it in the same query
+    template = db.relationship('VehicleTemplate', backref='instances', lazy='joined')
     
     def get_display_name(self):
         """Get display name (custom name or template name)."""
@@ -365,6 +489,13 @@ class PlayerVehicle(db.Model):
         base_cost = self.template.price * 0.08  # 8% of purchase price for full repair
         return int(base_cost * damage)
     
+    @classmethod
+    def repair_cost_expression(cls):
+        """SQL equivalent of get_repair_cost() (query must join VehicleTemplate)."""
+        damage = 1.0 - cls.condition
+        base_cost = VehicleTemplate.price * 0.08
+        return db.cast(base_cost * damage, db.Integer)
+    
     def repair(self, amount=1.0):
         """Repair vehicle."""
         self.condition = min(1.0, self.condition + amount)
@@ -377,6 +508,11 @@ class PlayerVehicle(db.Model):
         """Check if vehicle is operational."""
         return self.condition > 0.2  # Vehicles need 20% condition to operate
     
+    @classmethod
+    def operational_expression(cls):
+        """SQL equivalent of is_operational()."""
+        return cls.condition > 0.2
+    
     def to_dict(self):
         """Convert to dictionary."""
         return {
@@ -392,7 +528,7 @@ class PlayerVehicle(db.Model):
 class GameSession(db.Model):
     """Track game sessions for persistence."""
     id = db.Column(db.Integer, primary_key=True)
-    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False, index=True)
     session_data = db.Column(db.Text)  # JSON string for session state
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -402,9 +538,9 @@ class GameSession(db.Model):
     
     def get_data(self):
         """Get session data as dictionary."""
-        return json.loads(self.session_data) if self.session_data else {}
+        return parse_json_column(self, 'session_data', dict)
     
     def set_data(self, data_dict):
         """Set session data from dictionary."""
-        self.session_data = json.dumps(data_dict)
+        self.session_data = orjson.dumps(data_dict).decode('utf-8')
         self.updated_at = datetime.utcnow() 
\ No newline at end of file
@@ -0,0 +1,87 @@
+import math
+from typing import NamedTuple
+
+class SchemaError(ValueError):
+    """Raised when a request body does not match its schema."""
+
+class MoveRequest(NamedTuple):
+    """Body of /move_player."""
+    x: float = None
+    y: float = None
+    terrain_type: str = 'plains'
+    
+    # The map is 64x64 hexes and moves land on half-hex steps
+    bounds = {
+        'x': (0.0, 63.5),
+        'y': (0.0, 63.5)
+    }
+    bounds_message = 'Target position is off the map.'
+
+class CreateCharacterRequest(NamedTuple):
+    """Body of /create_character."""
+    name: str = ''
+    gunnery: int = 8
+    piloting: int = 8
+    guts: int = 8
+    tactics: int = 8
+    skills: dict = None
+    starting_mech: str = None
+    
+    bounds = {
+        'gunnery': (0, 8),
+        'piloting': (0, 8),
+        'guts': (0, 8),
+        'tactics': (0, 8)
+    }
+    bounds_message = 'All skills must be between 0 and 8.'
+
+class PurchaseMechRequest(NamedTuple):
+    """Body of /purchase_mech."""
+    mech_name: str = None
+
+class RepairRequest(NamedTuple):
+    """Body of /repair_unit."""
+    unit_type: str = None  # 'mech' or 'vehicle'
+    unit_id: int = None
+    repair_amount: float = 1.0  # Default to full repair
+    
+    bounds = {
+        'repair_amount': (0.0, 1.0)
+    }
+    bounds_message = 'Repair amount must be between 0 and 1.'
+
+def parse_body(schema, data):
+    """Build a schema instance from a decoded JSON body in a single pass."""
+    if not isinstance(data, dict):
+        raise SchemaError('Invalid request body.')
+    
+    values = []
+    for field, kind in schema.__annotations__.items():
+        value = data.get(field)
+        if value is None:
+            value = schema._field_defaults[field]
+        elif kind is str:
+            value = str(value).strip()
+        elif kind is dict:
+            if not isinstance(value, dict):
+                raise SchemaError(f'Invalid {field}.')
+        else:
+            try:
+                value = kind(value)
+            except (TypeError, ValueError):
+                raise SchemaError(f'Invalid {field}.')
+            
+            # float() accepts "nan" and "inf", which no field can hold
+            if kind is float and not math.isfinite(value):
+                raise SchemaError(f'Invalid {field}.')
+        values.append(value)
+    
+    request_body = schema._make(values)
+    
+    # Range checks shared by every field the schema constrains
+    for field, (low, high) in getattr(schema, 'bounds', {}).items():
+        value = getattr(request_body, field)
+        if value is not None and not low <= value <= high:
+            raise SchemaError(schema.bounds_message)
+    
+    return request_body
@@ -1,12 +1,32 @@
 import math
 import random
+import functools
+import numpy as np
+
+def _build_permutation(seed):
+    """Shuffle the doubled permutation table for a seed."""
+    # Private generator so seeding does not reset the global random state
+    rng = random.Random(seed)
+    perm = list(range(256))
+    rng.shuffle(perm)
+    perm += perm
+    
+    perm_array = np.array(perm, dtype=np.uint8)
+    perm_array.flags.writeable = False
+    
+    # Gradient index for every lattice corner: entry [a, b] is perm[(a + perm[b]) & 255] % 12,
+    # so each simplex corner is one gather at [ii + di, jj + dj] (a and b run to 256 for the +1 corners)
+    corner = np.arange(257)
+    gradient_index = perm_array[(corner[:, None] + perm_array[corner][None, :]) & 255] % 12
+    gradient_index.flags.writeable = False
+    return tuple(perm), perm_array, gradient_index
+
+# Seeded tables are deterministic, so regenerating a map reuses them
+_cached_permutation = functools.lru_cache(maxsize=8)(_build_permutation)
 
 class SimplexNoise:
     def __init__(self, seed=None):
         """Initialize Simplex noise generator with optional seed."""
-        if seed is not None:
-            random.seed(seed)
-            
         # Gradient vectors for 2D
         self.grad2 = [
             (1, 1), (-1, 1), (1, -1), (-1, -1),
@@ -14,28 +34,41 @@ class SimplexNoise:
             (0, 1), (0, -1), (0, 1), (0, -1)
         ]
         
-        # Permutation table
-        self.perm = list(range(256))
-        random.shuffle(self.perm)
-        self.perm += self.perm
+        # Permutation table, plus a byte array copy and per-corner gradient indices for
+        # the vectorized path; an unseeded generator must stay random, so only seeded
+        # tables are cached
+        if seed is None:
+            self.perm, self.perm_array, self.gradient_index = _build_permutation(seed)
+        else:
+            self.perm, self.perm_array, self.gradient_index = _cached_permutation(seed)
+        
+        # Gradient components as separate arrays for the vectorized path; the
+        # values are all -1, 0 or 1, so float32 is exact once promoted
+        self.grad2x = np.array([g[0] for g in self.grad2], dtype=np.float32)
+        self.grad2y = np.array([g[1] for g in self.grad2], dtype=np.float32)
+        
+        # Gradient index per permutation entry, so the scalar path skips the modulo
+        self.perm_mod12 = tuple(p % 12 for p in self.perm)
 
         # Skewing and unskewing factors for 2D
         self.F2 = 0.5 * (math.sqrt(3.0) - 1.0)
         self.G2 = (3.0 - math.sqrt(3.0)) / 6.0
-
-    def dot2d(self, g, x, y):
-        """Compute dot product in 2D."""
-        return g[0] * x + g[1] * y
+        self.G2x2 = 2.0 * self.G2
 
     def noise(self, xin, yin):
         """Generate 2D Simplex noise value."""
+        # Bind the per-call constants to locals once
+        F2 = self.F2
+        G2 = self.G2
+        G2x2 = self.G2x2
+        
         # Skew input space to determine which simplex cell we're in
-        s = (xin + yin) * self.F2
+        s = (xin + yin) * F2
         i = math.floor(xin + s)
         j = math.floor(yin + s)
         
         # Unskew back to (x,y) space
-        t = (i + j) * self.G2
+        t = (i + j) * G2
         X0 = i - t
         Y0 = j - t
         x0 = xin - X0
@@ -49,35 +82,41 @@ class SimplexNoise:
             j1 = 1
             
         # Offsets for corners
-        x1 = x0 - i1 + self.G2
-        y1 = y0 - j1 + self.G2
-        x2 = x0 - 1.0 + 2.0 * self.G2
-        y2 = y0 - 1.0 + 2.0 * self.G2
+        x1 = x0 - i1 + G2
+        y1 = y0 - j1 + G2
+        x2 = x0 - 1.0 + G2x2
+        y2 = y0 - 1.0 + G2x2
         
         # Work out the hashed gradient indices
         ii = int(i) & 255
         jj = int(j) & 255
-        gi0 = self.perm[(ii + self.perm[jj]) & 255] % 12
-        gi1 = self.perm[(ii + i1 + self.perm[jj + j1]) & 255] % 12
-        gi2 = self.perm[(ii + 1 + self.perm[jj + 1]) & 255] % 12
+        perm = self.perm
+        perm_mod12 = self.perm_mod12
+        gi0 = perm_mod12[(ii + perm[jj]) & 255]
+        gi1 = perm_mod12[(ii + i1 + perm[jj + j1]) & 255]
+        gi2 = perm_mod12[(ii + 1 + perm[jj + 1]) & 255]
         
-        # Calculate contribution from three corners
+        # Calculate contribution from three corners, with the gradient dot products inlined
+        grad2 = self.grad2
         n0, n1, n2 = 0.0, 0.0, 0.0
         
         t0 = 0.5 - x0 * x0 - y0 * y0
         if t0 >= 0:
             t0 *= t0
-            n0 = t0 * t0 * self.dot2d(self.grad2[gi0], x0, y0)
+            gx, gy = grad2[gi0]
+            n0 = t0 * t0 * (gx * x0 + gy * y0)
             
         t1 = 0.5 - x1 * x1 - y1 * y1
         if t1 >= 0:
             t1 *= t1
-            n1 = t1 * t1 * self.dot2d(self.grad2[gi1], x1, y1)
+            gx, gy = grad2[gi1]
+            n1 = t1 * t1 * (gx * x1 + gy * y1)
             
         t2 = 0.5 - x2 * x2 - y2 * y2
         if t2 >= 0:
             t2 *= t2
-            n2 = t2 * t2 * self.dot2d(self.grad2[gi2], x2, y2)
+            gx, gy = grad2[gi2]
+            n2 = t2 * t2 * (gx * x2 + gy * y2)
         
         # Add contributions from each corner to get the final noise value
         # The result is scaled to return values in the interval [-1,1]
@@ -85,4 +124,51 @@ class SimplexNoise:
 
     def normalized_noise(self, x, y):
         """Generate noise value normalized to [0,1] range."""
-        return (self.noise(x, y) + 1) / 2 
\ No newline at end of file
+        return (self.noise(x, y) + 1) / 2
+    
+    def noise_array(self, xin, yin):
+        """Generate 2D Simplex noise for whole arrays of coordinates at once."""
+        xin = np.asarray(xin, dtype=np.float64)
+        yin = np.asarray(yin, dtype=np.float64)
+        
+        # Skew input space to determine which simplex cell each point is in
+        s = (xin + yin) * self.F2
+        i = np.floor(xin + s)
+        j = np.floor(yin + s)
+        
+        # Unskew back to (x,y) space
+        t = (i + j) * self.G2
+        x0 = xin - (i - t)
+        y0 = yin - (j - t)
+        
+        # Determine which simplex each point is in
+        i1 = (x0 > y0).astype(np.int64)
+        j1 = 1 - i1
+        
+        # Offsets for corners
+        x1 = x0 - i1 + self.G2
+        y1 = y0 - j1 + self.G2
+        x2 = x0 - 1.0 + self.G2x2
+        y2 = y0 - 1.0 + self.G2x2
+        
+        # Look up the hashed gradient indices, one gather per corner
+        gradient_index = self.gradient_index
+        ii = i.astype(np.int64) & 255
+        jj = j.astype(np.int64) & 255
+        gi0 = gradient_index[ii, jj]
+        gi1 = gradient_index[ii + i1, jj + j1]
+        gi2 = gradient_index[ii + 1, jj + 1]
+        
+        # Sum the contribution from each corner that is in range
+        total = np.zeros_like(xin)
+        for gi, x, y in ((gi0, x0, y0), (gi1, x1, y1), (gi2, x2, y2)):
+            t = 0.5 - x * x - y * y
+            in_range = t >= 0
+            t *= t
+            total += np.where(in_range, t * t * (self.grad2x[gi] * x + self.grad2y[gi] * y), 0.0)
+        
+        return 70.0 * total
+    
+    def normalized_noise_array(self, x, y):
+        """Generate array noise values normalized to [0,1] range."""
+        return (self.noise_array(x, y) + 1) / 2